@@ -0,0 +1,65 @@
+"""add recipe search vector
+
+Revision ID: 2fa89773b288
+Revises: acdab284b339
+Create Date: 2026-10-18 04:46:24.479153
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2fa89773b288'
+down_revision: Union[str, None] = 'acdab284b339'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION recipe_search_vector(
+            name text, description text, ingredients text[]
+        ) RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$
+            SELECT setweight(to_tsvector('english', coalesce(name, '')), 'A')
+                || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+                || setweight(
+                    to_tsvector(
+                        'english', coalesce(array_to_string(ingredients, ' '), '')
+                    ),
+                    'C'
+                )
+        $$
+        """
+    )
+    op.add_column(
+        'recipes',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                'recipe_search_vector(name, description, ingredients)',
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_recipes_search_vector',
+        'recipes',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_recipes_search_vector', table_name='recipes', postgresql_using='gin'
+    )
+    op.drop_column('recipes', 'search_vector')
+    op.execute('DROP FUNCTION IF EXISTS recipe_search_vector(text, text, text[])')
@@ -0,0 +1,38 @@
+"""add trigram name indexes
+
+Revision ID: 45da15df4ad2
+Revises: 2fa89773b288
+Create Date: 2026-10-18 04:47:30.862565
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45da15df4ad2'
+down_revision: Union[str, None] = '2fa89773b288'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('authors', 'cuisines', 'categories', 'recipes'):
+        op.create_index(
+            f'ix_{table}_name_trgm',
+            table,
+            ['name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+        )
+
+
+def downgrade() -> None:
+    for table in ('authors', 'cuisines', 'categories', 'recipes'):
+        op.drop_index(
+            f'ix_{table}_name_trgm', table_name=table, postgresql_using='gin'
+        )
@@ -0,0 +1,257 @@
+"""add author stats
+
+Revision ID: 47b427d43f17
+Revises: f5ff209c4fcb
+Create Date: 2026-10-18 05:11:34.149649
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '47b427d43f17'
+down_revision: Union[str, None] = 'f5ff209c4fcb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'author_stats',
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column(
+            'recipe_count', sa.Integer(), server_default=sa.text('0'), nullable=False
+        ),
+        sa.ForeignKeyConstraint(
+            ['author_id'], ['authors.author_id'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('author_id'),
+    )
+    op.create_table(
+        'author_category_stats',
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('recipe_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['author_id'], ['authors.author_id'], ondelete='CASCADE'
+        ),
+        sa.ForeignKeyConstraint(
+            ['category_id'], ['categories.category_id'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('author_id', 'category_id'),
+    )
+    op.create_table(
+        'author_cuisine_stats',
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('cuisine_id', sa.Integer(), nullable=False),
+        sa.Column('recipe_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['author_id'], ['authors.author_id'], ondelete='CASCADE'
+        ),
+        sa.ForeignKeyConstraint(
+            ['cuisine_id'], ['cuisines.cuisine_id'], ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('author_id', 'cuisine_id'),
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION author_stats_bump(
+            p_author_id integer, p_cuisine_id integer, p_delta integer
+        ) RETURNS void LANGUAGE plpgsql AS $$
+        BEGIN
+            IF p_delta > 0 THEN
+                INSERT INTO author_stats AS s (author_id, recipe_count)
+                VALUES (p_author_id, p_delta)
+                ON CONFLICT (author_id)
+                DO UPDATE SET recipe_count = s.recipe_count + p_delta;
+                IF p_cuisine_id IS NOT NULL THEN
+                    INSERT INTO author_cuisine_stats AS s (author_id, cuisine_id, recipe_count)
+                    VALUES (p_author_id, p_cuisine_id, p_delta)
+                    ON CONFLICT (author_id, cuisine_id)
+                    DO UPDATE SET recipe_count = s.recipe_count + p_delta;
+                END IF;
+            ELSE
+                UPDATE author_stats SET recipe_count = recipe_count + p_delta
+                WHERE author_id = p_author_id;
+                UPDATE author_cuisine_stats SET recipe_count = recipe_count + p_delta
+                WHERE author_id = p_author_id AND cuisine_id = p_cuisine_id;
+                DELETE FROM author_cuisine_stats
+                WHERE author_id = p_author_id AND cuisine_id = p_cuisine_id
+                    AND recipe_count <= 0;
+            END IF;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION author_category_stats_bump(
+            p_author_id integer, p_category_id integer, p_delta integer
+        ) RETURNS void LANGUAGE plpgsql AS $$
+        BEGIN
+            IF p_delta > 0 THEN
+                INSERT INTO author_category_stats AS s (author_id, category_id, recipe_count)
+                VALUES (p_author_id, p_category_id, p_delta)
+                ON CONFLICT (author_id, category_id)
+                DO UPDATE SET recipe_count = s.recipe_count + p_delta;
+            ELSE
+                UPDATE author_category_stats SET recipe_count = recipe_count + p_delta
+                WHERE author_id = p_author_id AND category_id = p_category_id;
+                DELETE FROM author_category_stats
+                WHERE author_id = p_author_id AND category_id = p_category_id
+                    AND recipe_count <= 0;
+            END IF;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION author_stats_recipe_write() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' THEN
+                IF OLD.author_id IS NOT DISTINCT FROM NEW.author_id
+                    AND OLD.cuisine_id IS NOT DISTINCT FROM NEW.cuisine_id THEN
+                    RETURN NULL;
+                END IF;
+                IF OLD.author_id IS NOT NULL THEN
+                    PERFORM author_stats_bump(OLD.author_id, OLD.cuisine_id, -1);
+                    IF OLD.author_id IS DISTINCT FROM NEW.author_id THEN
+                        PERFORM author_category_stats_bump(OLD.author_id, category_id, -1)
+                        FROM recipe_category
+                        WHERE recipe_id = OLD.recipe_id AND category_id IS NOT NULL;
+                    END IF;
+                END IF;
+            END IF;
+            IF NEW.author_id IS NOT NULL THEN
+                PERFORM author_stats_bump(NEW.author_id, NEW.cuisine_id, 1);
+                IF TG_OP = 'UPDATE' AND OLD.author_id IS DISTINCT FROM NEW.author_id THEN
+                    PERFORM author_category_stats_bump(NEW.author_id, category_id, 1)
+                    FROM recipe_category
+                    WHERE recipe_id = NEW.recipe_id AND category_id IS NOT NULL;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION author_stats_recipe_delete() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF OLD.author_id IS NOT NULL THEN
+                PERFORM author_stats_bump(OLD.author_id, OLD.cuisine_id, -1);
+                PERFORM author_category_stats_bump(OLD.author_id, category_id, -1)
+                FROM recipe_category
+                WHERE recipe_id = OLD.recipe_id AND category_id IS NOT NULL;
+            END IF;
+            RETURN OLD;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION author_stats_recipe_category() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            recipe_author integer;
+        BEGIN
+            IF TG_OP IN ('DELETE', 'UPDATE') THEN
+                IF OLD.category_id IS NOT NULL THEN
+                    SELECT author_id INTO recipe_author
+                    FROM recipes WHERE recipe_id = OLD.recipe_id;
+                    IF recipe_author IS NOT NULL THEN
+                        PERFORM author_category_stats_bump(
+                            recipe_author, OLD.category_id, -1
+                        );
+                    END IF;
+                END IF;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                IF NEW.category_id IS NOT NULL THEN
+                    SELECT author_id INTO recipe_author
+                    FROM recipes WHERE recipe_id = NEW.recipe_id;
+                    IF recipe_author IS NOT NULL THEN
+                        PERFORM author_category_stats_bump(
+                            recipe_author, NEW.category_id, 1
+                        );
+                    END IF;
+                END IF;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    )
+    # CREATE TRIGGER locks recipes and recipe_category against writes until this
+    # migration commits, so the backfill below cannot miss or double-count rows.
+    op.execute(
+        """
+        CREATE TRIGGER recipes_author_stats_write
+        AFTER INSERT OR UPDATE OF author_id, cuisine_id ON recipes
+        FOR EACH ROW EXECUTE FUNCTION author_stats_recipe_write()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER recipes_author_stats_delete
+        BEFORE DELETE ON recipes
+        FOR EACH ROW EXECUTE FUNCTION author_stats_recipe_delete()
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER recipe_category_author_stats
+        AFTER INSERT OR UPDATE OR DELETE ON recipe_category
+        FOR EACH ROW EXECUTE FUNCTION author_stats_recipe_category()
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO author_stats (author_id, recipe_count)
+        SELECT author_id, count(*) FROM recipes
+        WHERE author_id IS NOT NULL
+        GROUP BY author_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO author_cuisine_stats (author_id, cuisine_id, recipe_count)
+        SELECT author_id, cuisine_id, count(*) FROM recipes
+        WHERE author_id IS NOT NULL AND cuisine_id IS NOT NULL
+        GROUP BY author_id, cuisine_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO author_category_stats (author_id, category_id, recipe_count)
+        SELECT recipes.author_id, recipe_category.category_id, count(*)
+        FROM recipe_category JOIN recipes USING (recipe_id)
+        WHERE recipes.author_id IS NOT NULL
+            AND recipe_category.category_id IS NOT NULL
+        GROUP BY recipes.author_id, recipe_category.category_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP TRIGGER IF EXISTS recipe_category_author_stats ON recipe_category')
+    op.execute('DROP TRIGGER IF EXISTS recipes_author_stats_delete ON recipes')
+    op.execute('DROP TRIGGER IF EXISTS recipes_author_stats_write ON recipes')
+    op.execute('DROP FUNCTION IF EXISTS author_stats_recipe_category()')
+    op.execute('DROP FUNCTION IF EXISTS author_stats_recipe_delete()')
+    op.execute('DROP FUNCTION IF EXISTS author_stats_recipe_write()')
+    op.execute(
+        'DROP FUNCTION IF EXISTS author_category_stats_bump(integer, integer, integer)'
+    )
+    op.execute('DROP FUNCTION IF EXISTS author_stats_bump(integer, integer, integer)')
+    op.drop_table('author_cuisine_stats')
+    op.drop_table('author_category_stats')
+    op.drop_table('author_stats')
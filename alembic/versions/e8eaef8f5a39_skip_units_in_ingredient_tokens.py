@@ -0,0 +1,63 @@
+"""skip units in ingredient tokens
+
+Revision ID: e8eaef8f5a39
+Revises: 47b427d43f17
+Create Date: 2026-10-18 05:31:48.848199
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8eaef8f5a39'
+down_revision: Union[str, None] = '47b427d43f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION recipe_ingredient_tokens(ingredients text[])
+        RETURNS text[] LANGUAGE sql IMMUTABLE AS $$
+            SELECT coalesce(array_agg(DISTINCT lexeme ORDER BY lexeme), '{}')
+            FROM unnest(ingredients) AS line,
+                unnest(to_tsvector('english', line))
+            WHERE lexeme ~ '^[a-z]{3,}$'
+                -- Units and modifiers, stemmed the same way as the lines.
+                AND lexeme <> ALL (tsvector_to_array(to_tsvector('english', '
+                    cup cups tablespoon tablespoons tbsp tbs teaspoon
+                    teaspoons tsp ounce ounces oz pound pounds lb lbs gram
+                    grams kilogram kilograms kg ml milliliter milliliters
+                    liter liters litre litres quart quarts pint pints gallon
+                    gallons pinch pinches dash dashes handful can cans package
+                    packages piece pieces slice slices stick sticks bunch
+                    sprig sprigs half quarter third whole large medium small
+                    fresh chopped diced minced sliced grated peeled finely
+                    roughly thinly taste optional divided
+                ')))
+        $$
+        """
+    )
+    # Stored generated columns are only recomputed when their row is updated.
+    # No trigger watches `ingredients`, so this rewrites tokens (and
+    # search_vector) without touching author stats.
+    op.execute('UPDATE recipes SET ingredients = ingredients')
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION recipe_ingredient_tokens(ingredients text[])
+        RETURNS text[] LANGUAGE sql IMMUTABLE AS $$
+            SELECT coalesce(array_agg(DISTINCT lexeme ORDER BY lexeme), '{}')
+            FROM unnest(ingredients) AS line,
+                unnest(to_tsvector('english', line))
+            WHERE lexeme ~ '^[a-z]{3,}$'
+        $$
+        """
+    )
+    op.execute('UPDATE recipes SET ingredients = ingredients')
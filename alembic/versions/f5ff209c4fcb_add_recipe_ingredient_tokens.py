@@ -0,0 +1,57 @@
+"""add recipe ingredient tokens
+
+Revision ID: f5ff209c4fcb
+Revises: 45da15df4ad2
+Create Date: 2026-10-18 04:48:34.405350
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5ff209c4fcb'
+down_revision: Union[str, None] = '45da15df4ad2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION recipe_ingredient_tokens(ingredients text[])
+        RETURNS text[] LANGUAGE sql IMMUTABLE AS $$
+            SELECT coalesce(array_agg(DISTINCT lexeme ORDER BY lexeme), '{}')
+            FROM unnest(ingredients) AS line,
+                unnest(to_tsvector('english', line))
+            WHERE lexeme ~ '^[a-z]{3,}$'
+        $$
+        """
+    )
+    op.add_column(
+        'recipes',
+        sa.Column(
+            'ingredient_tokens',
+            postgresql.ARRAY(sa.Text()),
+            sa.Computed('recipe_ingredient_tokens(ingredients)', persisted=True),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        'ix_recipes_ingredient_tokens',
+        'recipes',
+        ['ingredient_tokens'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        'ix_recipes_ingredient_tokens', table_name='recipes', postgresql_using='gin'
+    )
+    op.drop_column('recipes', 'ingredient_tokens')
+    op.execute('DROP FUNCTION IF EXISTS recipe_ingredient_tokens(text[])')
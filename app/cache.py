@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect, select
+from sqlalchemy.orm import make_transient_to_detached
+
+from . import models
+from .config import settings
+
+_missing = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _missing)
+            if entry is not _missing and entry[1] <= time.monotonic():
+                del self._entries[key]
+                entry = _missing
+            if entry is _missing:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl: float = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard(self, predicate):
+        with self._lock:
+            for key in [k for k, (v, _) in self._entries.items() if predicate(v)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+reference_caches = {
+    model: TTLCache(
+        settings.reference_cache_max_entries, settings.reference_cache_ttl_seconds
+    )
+    for model in (models.Author, models.Cuisine, models.Category)
+}
+
+
+# total=cached list counts, keyed by the compiled filter query.
+count_caches = {
+    model: TTLCache(
+        settings.total_count_cache_max_entries, settings.total_count_cache_ttl_seconds
+    )
+    for model in (models.Recipe, models.Author, models.Cuisine, models.Category)
+}
+
+
+# /recipes/facets results, keyed by the normalized search filters.
+facet_cache = TTLCache(
+    settings.facet_cache_max_entries, settings.facet_cache_ttl_seconds
+)
+
+
+def invalidate_counts(model):
+    count_caches[model].clear()
+
+
+def invalidate_recipe_caches():
+    # Called after any write that can change which recipes match a filter.
+    invalidate_counts(models.Recipe)
+    facet_cache.clear()
+
+
+def _primary_key(model):
+    return inspect(model).primary_key[0].key
+
+
+def row_data(row):
+    return {
+        attr.key: getattr(row, attr.key) for attr in inspect(row).mapper.column_attrs
+    }
+
+
+async def attach(db, model, data):
+    # Re-attach a copy to this session without a SELECT so relationships and
+    # response models can use it like a freshly loaded row.
+    row = model(**data)
+    make_transient_to_detached(row)
+    return await db.merge(row, load=False)
+
+
+def remember(row):
+    model = type(row)
+    data = row_data(row)
+    reference_caches[model].set(data[_primary_key(model)], data)
+    return row
+
+
+def forget(model, id: int):
+    reference_caches[model].delete(id)
+    # Recipe filters match on author and cuisine names, so a rename or delete
+    # can change recipe counts as well as this model's own.
+    invalidate_counts(model)
+    invalidate_recipe_caches()
+
+
+async def cached(db, model, id: int):
+    data = reference_caches[model].get(id)
+    if data is None:
+        return None
+    return await attach(db, model, data)
+
+
+async def get_reference(db, model, id: int):
+    row = await cached(db, model, id)
+    if row is None:
+        row = await db.scalar(
+            select(model).where(getattr(model, _primary_key(model)) == id)
+        )
+        if row:
+            remember(row)
+    return row
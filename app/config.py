@@ -1,3 +1,6 @@
+from typing import Literal
+
+from pydantic import conint
 from pydantic_settings import BaseSettings
 
 
@@ -10,6 +13,60 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    recipe_load_strategy: Literal["joined", "selectin"] = "joined"
+    # ts_rank_cd weights for the {D, C, B, A} labels; recipe search vectors
+    # label ingredients C, description B and name A.
+    search_rank_weights: list[float] = [0.1, 0.2, 0.4, 1.0]
+    fuzzy_similarity_threshold: float = 0.3
+    import_batch_size: int = 1000
+    reference_cache_ttl_seconds: float = 300
+    reference_cache_max_entries: int = 10000
+    principal_cache_ttl_seconds: float = 60
+    principal_cache_max_entries: int = 10000
+    total_count_cache_ttl_seconds: float = 60
+    total_count_cache_max_entries: int = 1000
+    facet_cache_ttl_seconds: float = 60
+    facet_cache_max_entries: int = 1000
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30
+    db_pool_recycle_seconds: int = 1800
+    db_pool_pre_ping: bool = True
+    # Read-only GET routes are spread over these hosts ("host" or "host:port",
+    # same credentials and database as the primary); empty means primary only.
+    database_replica_hostnames: list[str] = []
+    replica_retry_seconds: float = 30
+    # Build recipe responses directly from loaded rows and encode them with
+    # orjson instead of validating them through the response models.
+    fast_json_responses: bool = False
+    export_batch_size: int = 500
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 64
+    max_page_limit: int = 100
+    rate_limit_enabled: bool = True
+    rate_limit_read_per_second: float = 20
+    rate_limit_read_burst: float = 100
+    rate_limit_write_per_second: float = 2
+    rate_limit_write_burst: float = 20
+    rate_limit_max_buckets: int = 100000
+    # Peers whose X-Forwarded-For is believed: IPs or CIDR ranges, or "*" for
+    # any direct peer (e.g. behind the Heroku router, which is the only way in).
+    forwarded_allow_ips: list[str] = []
+    # Development/test aid: flag requests that repeat a statement more than
+    # `query_repeat_limit` times or run more than their query budget. Budgets
+    # are keyed "METHOD /route/template"; a negative budget skips the route.
+    query_guard: Literal["off", "warn", "raise"] = "off"
+    query_budget: int = 25
+    query_repeat_limit: int = 3
+    query_budgets: dict[str, int] = {
+        "GET /recipes/export": -1,
+        "POST /recipes/import": -1,
+    }
+    startup_db_retries: conint(ge=1) = 5
+    startup_db_retry_delay_seconds: float = 0.5
+    # Compare the database's Alembic revision with the code's head at startup.
+    startup_migration_check: Literal["off", "warn", "fail"] = "warn"
 
     class Config:
         env_file = ".env"
@@ -1,21 +1,130 @@
-from sqlalchemy import create_engine
+import itertools
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
 
-SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+
+
+def replica_url(hostname: str):
+    if ":" not in hostname:
+        hostname = f"{hostname}:{settings.database_port}"
+    return f"postgresql+asyncpg://{settings.database_username}:{settings.database_password}@{hostname}/{settings.database_name}"
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        # Time spent here is time a request waited for a connection, including
+        # opening a new one when the pool has to overflow.
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def pool_options():
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def pool_stats(engine):
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "max_overflow": settings.db_max_overflow,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": pool.checkouts,
+        "timeouts": pool.timeouts,
+        "wait_seconds_total": pool.wait_seconds_total,
+        "wait_seconds_max": pool.wait_seconds_max,
+        "wait_seconds_avg": (
+            pool.wait_seconds_total / pool.checkouts if pool.checkouts else 0.0
+        ),
+    }
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool, **pool_options()
+)
+
+replica_engines = {
+    hostname: create_async_engine(
+        replica_url(hostname), poolclass=TimedQueuePool, **pool_options()
+    )
+    for hostname in settings.database_replica_hostnames
+}
+replica_down_until = {hostname: 0.0 for hostname in replica_engines}
+_replica_turn = itertools.count()
+
+# Objects stay readable after commit: an async session cannot lazily refresh
+# expired attributes while a response is being serialized.
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def replica_candidates():
+    # Round-robin over replicas that are not cooling down after a failure.
+    hostnames = list(replica_engines)
+    if not hostnames:
+        return []
+    start = next(_replica_turn) % len(hostnames)
+    now = time.monotonic()
+    return [
+        hostname
+        for hostname in hostnames[start:] + hostnames[:start]
+        if replica_down_until[hostname] <= now
+    ]
+
+
+async def get_read_db():
+    # Replicas may lag the primary slightly, so only read-only routes that
+    # tolerate that use this; everything falls back to the primary.
+    for hostname in replica_candidates():
+        db = AsyncSessionLocal(bind=replica_engines[hostname])
+        try:
+            await db.connection()
+        except (exc.DBAPIError, exc.TimeoutError, OSError):
+            await db.close()
+            replica_down_until[hostname] = (
+                time.monotonic() + settings.replica_retry_seconds
+            )
+            continue
+        async with db:
+            yield db
+        return
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,98 @@
+import hashlib
+
+from fastapi import Request, Response, status
+from sqlalchemy import Text, func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from . import models
+from .serializers import render
+
+
+def _xmin(table):
+    # xmin is the id of the transaction that last wrote the row, so it changes
+    # on every UPDATE without needing a version column.
+    return literal_column(f"{table.name}.xmin").cast(Text)
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+
+def not_modified(etag: str, headers=None):
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={**(headers or {}), "ETag": etag},
+    )
+
+
+def recipe_version_columns():
+    # Versions of the recipe row and of the author, cuisine and category rows
+    # that appear in the full recipe body, along with which categories are
+    # linked. The related rows come from aliased subqueries correlated only on
+    # `recipes`, so these columns can be added to any query over recipes.
+    author = models.Author.__table__.alias("author_version")
+    cuisine = models.Cuisine.__table__.alias("cuisine_version")
+    category = models.Category.__table__.alias("category_version")
+    links = (
+        select(
+            func.array_agg(
+                aggregate_order_by(
+                    func.concat(category.c.category_id, ":", _xmin(category)),
+                    category.c.category_id,
+                )
+            )
+        )
+        .join(
+            models.recipe_category,
+            category.c.category_id == models.recipe_category.c.category_id,
+        )
+        .where(models.recipe_category.c.recipe_id == models.Recipe.recipe_id)
+        .scalar_subquery()
+    )
+    return [
+        _xmin(models.Recipe.__table__),
+        select(_xmin(author))
+        .where(author.c.author_id == models.Recipe.author_id)
+        .scalar_subquery(),
+        select(_xmin(cuisine))
+        .where(cuisine.c.cuisine_id == models.Recipe.cuisine_id)
+        .scalar_subquery(),
+        links,
+    ]
+
+
+async def recipe_version(db, id: int, related: bool = False):
+    # Reads only row versions, never the recipe's own columns.
+    columns = recipe_version_columns() if related else [_xmin(models.Recipe.__table__)]
+    row = (
+        await db.execute(
+            select(models.Recipe.recipe_id, *columns).where(
+                models.Recipe.recipe_id == id
+            )
+        )
+    ).first()
+    return tuple(row) if row else None
+
+
+def json_response(request: Request, response: Response, model, content, fields=None):
+    # Serializes the way FastAPI would for `response_model=model`. Unless the
+    # route already set an ETag from row versions, the body is hashed and an
+    # unchanged one is answered with 304 and no payload.
+    body = render(model, content, fields)
+    etag = response.headers.get("ETag") or make_etag(body)
+    headers = dict(response.headers)
+    if etag_matches(request, etag):
+        return not_modified(etag, headers)
+    return Response(
+        body, media_type="application/json", headers={**headers, "ETag": etag}
+    )
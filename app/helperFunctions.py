@@ -1,43 +1,261 @@
+import csv
+import io
+from contextlib import asynccontextmanager
+
+from sqlalchemy import exc, insert, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import (
+    contains_eager,
+    joinedload,
+    load_only,
+    selectinload,
+    undefer_group,
+)
+
 from app import models, schemas
+from app.cache import invalidate_counts, remember
+from app.config import settings
+from app.database import get_read_db
+from app.serializers import (
+    encode_json,
+    recipe_csv_columns,
+    recipe_csv_rows,
+    recipe_out,
+)
+
+
+def recipe_load_options(joined: bool = False, fields=None):
+    # "joined" pulls author and cuisine into the recipe SELECT and fetches all
+    # categories of the page in one extra IN query; "selectin" uses one IN
+    # query per relationship. Async sessions cannot lazy load, so every recipe
+    # query must use one of these. With `fields` only those columns and
+    # relationships are loaded.
+    if settings.recipe_load_strategy == "selectin":
+        loaders = {
+            "author": selectinload(models.Recipe.author),
+            "cuisine": selectinload(models.Recipe.cuisine),
+            "categories": selectinload(models.Recipe.categories),
+        }
+    elif joined:
+        loaders = {
+            "author": contains_eager(models.Recipe.author),
+            "cuisine": contains_eager(models.Recipe.cuisine),
+            "categories": selectinload(models.Recipe.categories),
+        }
+    else:
+        loaders = {
+            "author": joinedload(models.Recipe.author),
+            "cuisine": joinedload(models.Recipe.cuisine),
+            "categories": selectinload(models.Recipe.categories),
+        }
+    if fields is None:
+        return [undefer_group("heavy"), *loaders.values()]
+    columns = [getattr(models.Recipe, name) for name in fields if name not in loaders]
+    return [
+        load_only(*columns),
+        *[loader for name, loader in loaders.items() if name in fields],
+    ]
+
 
+async def load_recipe(db, id: int, fields=None):
+    return await db.scalar(
+        select(models.Recipe)
+        .options(*recipe_load_options(fields=fields))
+        .where(models.Recipe.recipe_id == id)
+        .execution_options(populate_existing=True)
+    )
 
-def insert_cusine(cuisine_name: schemas.Cuisine, db, current_user):
+
+async def author_breakdown(db, author_id: int, stats, model, key):
+    # Reads one of the trigger-maintained author_*_stats tables, largest first.
+    rows = await db.execute(
+        select(key, model.name, stats.c.recipe_count)
+        .join(stats, stats.c[key.key] == key)
+        .where(stats.c.author_id == author_id)
+        .order_by(stats.c.recipe_count.desc(), model.name)
+    )
+    return rows.mappings().all()
+
+
+async def insert_cusine(cuisine_name: schemas.Cuisine, db, current_user):
     if not cuisine_name:
         return cuisine_name
-    cuisine = db.query(models.Cuisine).filter_by(name=cuisine_name).first()
-    if cuisine:
-        return cuisine.cuisine_id
-    else:
-        new_cuisine = models.Cuisine(name=cuisine_name, owner_id=current_user.id)
-        db.add(new_cuisine)
-        db.commit()
-        db.refresh(new_cuisine)
-        return new_cuisine.cuisine_id
+    cuisines = await resolve_names(models.Cuisine, [cuisine_name], db, current_user)
+    return cuisines[cuisine_name].cuisine_id
 
 
-def insert_author(author_name: schemas.Author, db, current_user):
+async def insert_author(author_name: schemas.Author, db, current_user):
     if not author_name:
         return author_name
-    author = db.query(models.Author).filter_by(name=author_name).first()
-    if author:
-        return author.author_id
-    else:
-        new_author = models.Author(name=author_name, owner_id=current_user.id)
-        db.add(new_author)
-        db.commit()
-        db.refresh(new_author)
-        return new_author.author_id
+    authors = await resolve_names(models.Author, [author_name], db, current_user)
+    return authors[author_name].author_id
 
 
-def insert_categories(categories, db, current_user):
+async def insert_categories(categories, db, current_user):
     if not categories:
         return categories
-    recipe_categories = []
-    for category_name in categories:
-        category = db.query(models.Category).filter_by(name=category_name).first()
-        if not category:
-            category = models.Category(name=category_name, owner_id=current_user.id)
-            db.add(category)
-            db.commit()
-        recipe_categories.append(category)
-    return recipe_categories
+    # Blank names are skipped, as resolve_names skips them.
+    found = await resolve_names(models.Category, categories, db, current_user)
+    return [found[name] for name in dict.fromkeys(categories) if name]
+
+
+async def resolve_names(model, names, db, current_user):
+    # One SELECT, then a single conflict-tolerant INSERT and re-SELECT for any
+    # names that are still missing. The reference cache is only warmed here,
+    # never trusted: another worker may have deleted a cached row, and linking
+    # to it would fail the foreign key. Nothing is committed here, and rows
+    # created in this transaction are not cached until a later lookup finds
+    # them committed.
+    names = {name for name in names if name}
+    found = {}
+    if not names:
+        return found
+    for row in await db.scalars(select(model).where(model.name.in_(names))):
+        found[row.name] = remember(row)
+    missing = names - found.keys()
+    if missing:
+        inserted = await db.scalars(
+            pg_insert(model)
+            .values([{"name": name, "owner_id": current_user.id} for name in missing])
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(model.name)
+        )
+        if inserted.all():
+            invalidate_counts(model)
+        rows = await db.scalars(select(model).where(model.name.in_(missing)))
+        found.update({row.name: row for row in rows})
+    return found
+
+
+async def iter_lines(chunks):
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def export_recipes(format: str):
+    # Runs after the route has returned, so it opens its own session. Rows
+    # come from a server-side cursor `export_batch_size` at a time and each
+    # batch is dropped from the session once written, keeping memory flat.
+    async with asynccontextmanager(get_read_db)() as db:
+        if format == "csv":
+            header = io.StringIO()
+            csv.writer(header).writerow(recipe_csv_columns)
+            yield header.getvalue()
+        result = await db.stream(
+            select(models.Recipe)
+            .options(*recipe_load_options())
+            .order_by(models.Recipe.recipe_id)
+            .execution_options(yield_per=settings.export_batch_size)
+        )
+        async for recipes in result.scalars().partitions():
+            if format == "csv":
+                yield recipe_csv_rows(recipes)
+            else:
+                yield b"".join(encode_json(recipe_out(r)) + b"\n" for r in recipes)
+            db.expunge_all()
+
+
+async def insert_recipes(db, rows, row_categories):
+    recipe_ids = (
+        await db.scalars(
+            insert(models.Recipe).returning(
+                models.Recipe.recipe_id, sort_by_parameter_order=True
+            ),
+            rows,
+        )
+    ).all()
+    links = [
+        {"recipe_id": recipe_id, "category_id": category_id}
+        for recipe_id, category_ids in zip(recipe_ids, row_categories)
+        for category_id in category_ids
+    ]
+    if links:
+        await db.execute(insert(models.recipe_category), links)
+    return recipe_ids
+
+
+async def insert_recipe_batch(batch, db, current_user):
+    # `batch` is a list of (line number, schemas.Recipe); returns one result
+    # per line and commits the whole batch at once. If the database rejects
+    # the batch, it is retried row by row so only the offending lines fail.
+    recipes = [recipe for _, recipe in batch]
+    cuisines = await resolve_names(
+        models.Cuisine, [recipe.cuisine for recipe in recipes], db, current_user
+    )
+    authors = await resolve_names(
+        models.Author, [recipe.author for recipe in recipes], db, current_user
+    )
+    categories = await resolve_names(
+        models.Category,
+        [name for recipe in recipes for name in recipe.category or []],
+        db,
+        current_user,
+    )
+
+    keys = {
+        (recipe.name, authors[recipe.author].author_id)
+        for recipe in recipes
+        if recipe.author
+    }
+    existing = set()
+    if keys:
+        rows = await db.execute(
+            select(models.Recipe.name, models.Recipe.author_id).where(
+                tuple_(models.Recipe.name, models.Recipe.author_id).in_(keys)
+            )
+        )
+        existing = {tuple(row) for row in rows}
+
+    results, rows, row_lines, row_categories = [], [], [], []
+    for line, recipe in batch:
+        author = authors.get(recipe.author)
+        if author:
+            key = (recipe.name, author.author_id)
+            if key in existing:
+                detail = f"The Recipe, {recipe.name}, by {recipe.author} already exists"
+                results.append({"line": line, "status": "conflict", "detail": detail})
+                continue
+            existing.add(key)
+        cuisine = cuisines.get(recipe.cuisine)
+        rows.append(
+            {
+                **recipe.model_dump(exclude={"cuisine", "author", "category"}),
+                "cuisine_id": cuisine.cuisine_id if cuisine else None,
+                "author_id": author.author_id if author else None,
+                "owner_id": current_user.id,
+            }
+        )
+        row_lines.append(line)
+        row_categories.append(
+            {categories[name].category_id for name in recipe.category or [] if name}
+        )
+
+    if rows:
+        try:
+            async with db.begin_nested():
+                outcomes = await insert_recipes(db, rows, row_categories)
+        except exc.DBAPIError:
+            outcomes = []
+            for row, category_ids in zip(rows, row_categories):
+                try:
+                    async with db.begin_nested():
+                        outcomes += await insert_recipes(db, [row], [category_ids])
+                except exc.DBAPIError as e:
+                    outcomes.append(e)
+        for line, outcome in zip(row_lines, outcomes):
+            if isinstance(outcome, exc.DBAPIError):
+                # asyncpg messages start with "<class '...'>: ".
+                detail = str(outcome.orig).splitlines()[0].rpartition(">: ")[2]
+                results.append({"line": line, "status": "error", "detail": detail})
+            else:
+                results.append(
+                    {"line": line, "status": "created", "recipe_id": outcome}
+                )
+    await db.commit()
+    return results
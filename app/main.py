@@ -1,9 +1,14 @@
+import time
+
+started = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app import models
+from app import queryguard, startup
 
-from .database import engine
+from .metrics import MetricsMiddleware
+from .ratelimit import RateLimitMiddleware
 from .routers import (
     auth,
     author,
@@ -11,23 +16,30 @@ from .routers import (
     cuisine,
     direction,
     ingredients,
+    metrics,
     recipe,
+    stats,
     user,
 )
 
-models.Base.metadata.create_all(bind=engine)
+startup.record_phase("imports", time.perf_counter() - started)
 
-app = FastAPI()
+routers_started = time.perf_counter()
+app = FastAPI(lifespan=startup.lifespan)
 
 origins = ["*"]
 
+# Added first so it runs inside CORS and 429 responses still carry CORS headers.
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "Link"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(user.router)
 app.include_router(auth.router)
@@ -37,6 +49,10 @@ app.include_router(category.router)
 app.include_router(cuisine.router)
 app.include_router(ingredients.router)
 app.include_router(direction.router)
+app.include_router(stats.router)
+app.include_router(metrics.router)
+
+startup.record_phase("routers", time.perf_counter() - routers_started)
 
 
 @app.get("/")
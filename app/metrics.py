@@ -0,0 +1,216 @@
+import bisect
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from .database import async_engine, replica_engines
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = (
+        "scope",
+        "queries",
+        "db_seconds",
+        "serialize_seconds",
+        "endpoint_done",
+        "statements",
+    )
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.endpoint_done = None
+        self.statements = None
+
+
+# Set for the duration of each HTTP request. SQLAlchemy runs engine events in
+# a greenlet that shares the request task's context, so the listeners below
+# see the same RequestStats as the middleware.
+current_request: ContextVar[RequestStats] = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is not None and context is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - context._metrics_started
+
+
+for _engine in [async_engine, *replica_engines.values()]:
+    event.listen(_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def record_serialization(seconds: float):
+    stats = current_request.get()
+    if stats is not None:
+        stats.serialize_seconds += seconds
+
+
+class MetricsRoute(APIRoute):
+    # Marks when the endpoint returned, so the time until the response starts
+    # (response_model validation and JSON encoding) counts as serialization.
+    def __init__(self, path, endpoint, **kwargs):
+        if inspect.iscoroutinefunction(endpoint):
+
+            @functools.wraps(endpoint)
+            async def timed_endpoint(*args, **kwargs):
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    _endpoint_done()
+
+        else:
+
+            @functools.wraps(endpoint)
+            def timed_endpoint(*args, **kwargs):
+                try:
+                    return endpoint(*args, **kwargs)
+                finally:
+                    _endpoint_done()
+
+        super().__init__(path, timed_endpoint, **kwargs)
+
+
+def _endpoint_done():
+    stats = current_request.get()
+    if stats is not None:
+        stats.endpoint_done = time.perf_counter()
+
+
+class Registry:
+    def __init__(self):
+        self.routes = {}
+        self.statuses = {}
+
+    def observe(self, method, route, status, seconds, stats, size):
+        entry = self.routes.get((method, route))
+        if entry is None:
+            entry = self.routes[(method, route)] = {
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                "seconds": 0.0,
+                "count": 0,
+                "queries": 0,
+                "db_seconds": 0.0,
+                "serialize_seconds": 0.0,
+                "bytes": 0,
+            }
+        entry["buckets"][bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        entry["seconds"] += seconds
+        entry["count"] += 1
+        entry["queries"] += stats.queries
+        entry["db_seconds"] += stats.db_seconds
+        entry["serialize_seconds"] += stats.serialize_seconds
+        entry["bytes"] += size
+        key = (method, route, status)
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def render(self):
+        lines = [
+            "# HELP recipeapi_requests_total Requests by route template and status.",
+            "# TYPE recipeapi_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.statuses.items()):
+            labels = _labels(method=method, route=route, status=status)
+            lines.append(f"recipeapi_requests_total{{{labels}}} {count}")
+
+        lines += [
+            "# HELP recipeapi_request_duration_seconds Request latency by route template.",
+            "# TYPE recipeapi_request_duration_seconds histogram",
+        ]
+        for (method, route), entry in sorted(self.routes.items()):
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), entry["buckets"]):
+                cumulative += count
+                labels = _labels(method=method, route=route, le=bound)
+                lines.append(
+                    f"recipeapi_request_duration_seconds_bucket{{{labels}}} {cumulative}"
+                )
+            labels = _labels(method=method, route=route)
+            lines.append(
+                f"recipeapi_request_duration_seconds_sum{{{labels}}} {entry['seconds']}"
+            )
+            lines.append(
+                f"recipeapi_request_duration_seconds_count{{{labels}}} {entry['count']}"
+            )
+
+        for name, key, description in [
+            ("db_queries_total", "queries", "SQL statements executed."),
+            ("db_seconds_total", "db_seconds", "Time spent executing SQL."),
+            (
+                "serialization_seconds_total",
+                "serialize_seconds",
+                "Time spent building response bodies.",
+            ),
+            ("response_bytes_total", "bytes", "Response body bytes sent."),
+        ]:
+            lines += [
+                f"# HELP recipeapi_{name} {description}",
+                f"# TYPE recipeapi_{name} counter",
+            ]
+            for (method, route), entry in sorted(self.routes.items()):
+                labels = _labels(method=method, route=route)
+                lines.append(f"recipeapi_{name}{{{labels}}} {entry[key]}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status, size = 500, 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if stats.endpoint_done is not None:
+                    stats.serialize_seconds += time.perf_counter() - stats.endpoint_done
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            current_request.reset(token)
+            route = scope.get("route")
+            registry.observe(
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status,
+                time.perf_counter() - started,
+                stats,
+                size,
+            )
@@ -1,22 +1,214 @@
 from sqlalchemy import (
     ARRAY,
+    DDL,
     JSON,
     TIMESTAMP,
     Boolean,
     Column,
+    Computed,
     ForeignKey,
+    Index,
     Integer,
     Interval,
     String,
     Table,
     Text,
     Time,
+    event,
     text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
 from .database import Base
 
+recipe_search_vector_function = DDL("""
+    CREATE OR REPLACE FUNCTION recipe_search_vector(
+        name text, description text, ingredients text[]
+    ) RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$
+        SELECT setweight(to_tsvector('english', coalesce(name, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            || setweight(
+                to_tsvector('english', coalesce(array_to_string(ingredients, ' '), '')),
+                'C'
+            )
+    $$
+    """)
+
+recipe_ingredient_tokens_function = DDL("""
+    CREATE OR REPLACE FUNCTION recipe_ingredient_tokens(ingredients text[])
+    RETURNS text[] LANGUAGE sql IMMUTABLE AS $$
+        SELECT coalesce(array_agg(DISTINCT lexeme ORDER BY lexeme), '{}')
+        FROM unnest(ingredients) AS line,
+            unnest(to_tsvector('english', line))
+        WHERE lexeme ~ '^[a-z]{3,}$'
+            -- Units and modifiers, stemmed the same way as the lines.
+            AND lexeme <> ALL (tsvector_to_array(to_tsvector('english', '
+                cup cups tablespoon tablespoons tbsp tbs teaspoon teaspoons
+                tsp ounce ounces oz pound pounds lb lbs gram grams kilogram
+                kilograms kg ml milliliter milliliters liter liters litre
+                litres quart quarts pint pints gallon gallons pinch pinches
+                dash dashes handful can cans package packages piece pieces
+                slice slices stick sticks bunch sprig sprigs half quarter
+                third whole large medium small fresh chopped diced minced
+                sliced grated peeled finely roughly thinly taste optional
+                divided
+            ')))
+    $$
+    """)
+
+pg_trgm_extension = DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+# author_stats, author_category_stats and author_cuisine_stats are kept up to
+# date by these triggers. Increments upsert; decrements are plain UPDATEs, so
+# they never re-create a row that a cascaded delete has already removed.
+author_stats_functions = [
+    DDL("""
+    CREATE OR REPLACE FUNCTION author_stats_bump(
+        p_author_id integer, p_cuisine_id integer, p_delta integer
+    ) RETURNS void LANGUAGE plpgsql AS $$
+    BEGIN
+        IF p_delta > 0 THEN
+            INSERT INTO author_stats AS s (author_id, recipe_count)
+            VALUES (p_author_id, p_delta)
+            ON CONFLICT (author_id)
+            DO UPDATE SET recipe_count = s.recipe_count + p_delta;
+            IF p_cuisine_id IS NOT NULL THEN
+                INSERT INTO author_cuisine_stats AS s (author_id, cuisine_id, recipe_count)
+                VALUES (p_author_id, p_cuisine_id, p_delta)
+                ON CONFLICT (author_id, cuisine_id)
+                DO UPDATE SET recipe_count = s.recipe_count + p_delta;
+            END IF;
+        ELSE
+            UPDATE author_stats SET recipe_count = recipe_count + p_delta
+            WHERE author_id = p_author_id;
+            UPDATE author_cuisine_stats SET recipe_count = recipe_count + p_delta
+            WHERE author_id = p_author_id AND cuisine_id = p_cuisine_id;
+            DELETE FROM author_cuisine_stats
+            WHERE author_id = p_author_id AND cuisine_id = p_cuisine_id
+                AND recipe_count <= 0;
+        END IF;
+    END
+    $$
+    """),
+    DDL("""
+    CREATE OR REPLACE FUNCTION author_category_stats_bump(
+        p_author_id integer, p_category_id integer, p_delta integer
+    ) RETURNS void LANGUAGE plpgsql AS $$
+    BEGIN
+        IF p_delta > 0 THEN
+            INSERT INTO author_category_stats AS s (author_id, category_id, recipe_count)
+            VALUES (p_author_id, p_category_id, p_delta)
+            ON CONFLICT (author_id, category_id)
+            DO UPDATE SET recipe_count = s.recipe_count + p_delta;
+        ELSE
+            UPDATE author_category_stats SET recipe_count = recipe_count + p_delta
+            WHERE author_id = p_author_id AND category_id = p_category_id;
+            DELETE FROM author_category_stats
+            WHERE author_id = p_author_id AND category_id = p_category_id
+                AND recipe_count <= 0;
+        END IF;
+    END
+    $$
+    """),
+    DDL("""
+    CREATE OR REPLACE FUNCTION author_stats_recipe_write() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'UPDATE' THEN
+            IF OLD.author_id IS NOT DISTINCT FROM NEW.author_id
+                AND OLD.cuisine_id IS NOT DISTINCT FROM NEW.cuisine_id THEN
+                RETURN NULL;
+            END IF;
+            IF OLD.author_id IS NOT NULL THEN
+                PERFORM author_stats_bump(OLD.author_id, OLD.cuisine_id, -1);
+                IF OLD.author_id IS DISTINCT FROM NEW.author_id THEN
+                    PERFORM author_category_stats_bump(OLD.author_id, category_id, -1)
+                    FROM recipe_category
+                    WHERE recipe_id = OLD.recipe_id AND category_id IS NOT NULL;
+                END IF;
+            END IF;
+        END IF;
+        IF NEW.author_id IS NOT NULL THEN
+            PERFORM author_stats_bump(NEW.author_id, NEW.cuisine_id, 1);
+            IF TG_OP = 'UPDATE' AND OLD.author_id IS DISTINCT FROM NEW.author_id THEN
+                PERFORM author_category_stats_bump(NEW.author_id, category_id, 1)
+                FROM recipe_category
+                WHERE recipe_id = NEW.recipe_id AND category_id IS NOT NULL;
+            END IF;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """),
+    # BEFORE DELETE, because once the recipe is gone the cascaded
+    # recipe_category deletes can no longer find its author.
+    DDL("""
+    CREATE OR REPLACE FUNCTION author_stats_recipe_delete() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF OLD.author_id IS NOT NULL THEN
+            PERFORM author_stats_bump(OLD.author_id, OLD.cuisine_id, -1);
+            PERFORM author_category_stats_bump(OLD.author_id, category_id, -1)
+            FROM recipe_category
+            WHERE recipe_id = OLD.recipe_id AND category_id IS NOT NULL;
+        END IF;
+        RETURN OLD;
+    END
+    $$
+    """),
+    DDL("""
+    CREATE OR REPLACE FUNCTION author_stats_recipe_category() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        recipe_author integer;
+    BEGIN
+        IF TG_OP IN ('DELETE', 'UPDATE') THEN
+            IF OLD.category_id IS NOT NULL THEN
+                SELECT author_id INTO recipe_author
+                FROM recipes WHERE recipe_id = OLD.recipe_id;
+                IF recipe_author IS NOT NULL THEN
+                    PERFORM author_category_stats_bump(
+                        recipe_author, OLD.category_id, -1
+                    );
+                END IF;
+            END IF;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            IF NEW.category_id IS NOT NULL THEN
+                SELECT author_id INTO recipe_author
+                FROM recipes WHERE recipe_id = NEW.recipe_id;
+                IF recipe_author IS NOT NULL THEN
+                    PERFORM author_category_stats_bump(
+                        recipe_author, NEW.category_id, 1
+                    );
+                END IF;
+            END IF;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """),
+]
+
+author_stats_triggers = [
+    DDL("""
+    CREATE TRIGGER recipes_author_stats_write
+    AFTER INSERT OR UPDATE OF author_id, cuisine_id ON recipes
+    FOR EACH ROW EXECUTE FUNCTION author_stats_recipe_write()
+    """),
+    DDL("""
+    CREATE TRIGGER recipes_author_stats_delete
+    BEFORE DELETE ON recipes
+    FOR EACH ROW EXECUTE FUNCTION author_stats_recipe_delete()
+    """),
+    DDL("""
+    CREATE TRIGGER recipe_category_author_stats
+    AFTER INSERT OR UPDATE OR DELETE ON recipe_category
+    FOR EACH ROW EXECUTE FUNCTION author_stats_recipe_category()
+    """),
+]
+
 recipe_category = Table(
     "recipe_category",
     Base.metadata,
@@ -26,6 +218,54 @@ recipe_category = Table(
     ),
 )
 
+author_stats = Table(
+    "author_stats",
+    Base.metadata,
+    Column(
+        "author_id",
+        Integer,
+        ForeignKey("authors.author_id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("recipe_count", Integer, nullable=False, server_default=text("0")),
+)
+
+author_category_stats = Table(
+    "author_category_stats",
+    Base.metadata,
+    Column(
+        "author_id",
+        Integer,
+        ForeignKey("authors.author_id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "category_id",
+        Integer,
+        ForeignKey("categories.category_id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("recipe_count", Integer, nullable=False),
+)
+
+author_cuisine_stats = Table(
+    "author_cuisine_stats",
+    Base.metadata,
+    Column(
+        "author_id",
+        Integer,
+        ForeignKey("authors.author_id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "cuisine_id",
+        Integer,
+        ForeignKey("cuisines.cuisine_id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column("recipe_count", Integer, nullable=False),
+)
+
 
 class User(Base):
     __tablename__ = "users"
@@ -52,6 +292,15 @@ class Author(Base):
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
 
+    __table_args__ = (
+        Index(
+            "ix_authors_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
 
 class Cuisine(Base):
     __tablename__ = "cuisines"
@@ -65,6 +314,15 @@ class Cuisine(Base):
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
 
+    __table_args__ = (
+        Index(
+            "ix_cuisines_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
 
 class Category(Base):
     __tablename__ = "categories"
@@ -78,6 +336,15 @@ class Category(Base):
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
 
+    __table_args__ = (
+        Index(
+            "ix_categories_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
 
 class Recipe(Base):
     __tablename__ = "recipes"
@@ -94,17 +361,20 @@ class Recipe(Base):
     author_id = Column(Integer, ForeignKey("authors.author_id"))
     author = relationship("Author")
 
-    categories = relationship("Category", secondary=recipe_category)
+    categories = relationship(
+        "Category", secondary=recipe_category, passive_deletes=True
+    )
 
-    description = Column(Text)
+    # Large text/JSON columns are only loaded when a response needs them.
+    description = deferred(Column(Text), group="heavy")
 
     servings = Column(String(50))
 
-    nutrition_facts = Column(JSON)
+    nutrition_facts = deferred(Column(JSON), group="heavy")
 
     ingredients = Column(ARRAY(String))
 
-    direction = Column(JSON)
+    direction = deferred(Column(JSON), group="heavy")
 
     prep_time = Column(Interval)
     cook_time = Column(Interval)
@@ -120,3 +390,43 @@ class Recipe(Base):
     owner_id = Column(
         Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
+
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "recipe_search_vector(name, description, ingredients)",
+                persisted=True,
+            ),
+        )
+    )
+
+    ingredient_tokens = deferred(
+        Column(
+            ARRAY(Text),
+            Computed("recipe_ingredient_tokens(ingredients)", persisted=True),
+        )
+    )
+
+    __table_args__ = (
+        Index("ix_recipes_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_recipes_ingredient_tokens",
+            "ingredient_tokens",
+            postgresql_using="gin",
+        ),
+        Index(
+            "ix_recipes_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
+
+event.listen(Base.metadata, "before_create", pg_trgm_extension)
+event.listen(Recipe.__table__, "before_create", recipe_search_vector_function)
+event.listen(Recipe.__table__, "before_create", recipe_ingredient_tokens_function)
+# recipe_category is created after recipes, so both trigger targets exist.
+for ddl in author_stats_functions + author_stats_triggers:
+    event.listen(recipe_category, "after_create", ddl)
@@ -1,12 +1,15 @@
+import time
 from datetime import datetime, timedelta
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import database, models, schemas
 
+from .cache import TTLCache, attach, row_data
 from .config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
@@ -15,6 +18,10 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+principal_cache = TTLCache(
+    settings.principal_cache_max_entries, settings.principal_cache_ttl_seconds
+)
+
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -37,7 +44,7 @@ def verify_access_token(token: str, credentials_exception):
         if id is None:
             raise credentials_exception
 
-        token_data = schemas.TokenData(id=id)
+        token_data = schemas.TokenData(id=id, exp=payload.get("exp"))
 
     except JWTError:
         raise credentials_exception
@@ -45,8 +52,19 @@ def verify_access_token(token: str, credentials_exception):
     return token_data
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)
+def token_user_id(token: str):
+    data = principal_cache.get(token)
+    if data is not None:
+        return data["id"]
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("user_id")
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_db)
 ):
     credentials_exceptions = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,8 +72,39 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    token = verify_access_token(token, credentials_exceptions)
+    data = principal_cache.get(token)
+    if data is not None:
+        return await attach(db, models.User, data)
 
-    user = db.query(models.User).filter(models.User.id == token.id).first()
+    token_data = verify_access_token(token, credentials_exceptions)
+
+    user = await db.scalar(
+        select(models.User).where(models.User.id == int(token_data.id))
+    )
+
+    if user:
+        ttl = settings.principal_cache_ttl_seconds
+        if token_data.exp is not None:
+            ttl = min(ttl, token_data.exp - time.time())
+        if ttl > 0:
+            # Authorization never needs the password hash, so it is not kept
+            # in memory; the attached copy leaves that column unloaded.
+            data = row_data(user)
+            del data["password"]
+            principal_cache.set(token, data, ttl)
 
     return user
+
+
+def invalidate_token(token: str):
+    principal_cache.delete(token)
+
+
+def invalidate_user(user_id: int):
+    principal_cache.discard(lambda data: data["id"] == user_id)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.id)
@@ -0,0 +1,179 @@
+import base64
+import binascii
+import json
+import math
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from .cache import count_caches
+from .config import settings
+from .etag import etag_matches, make_etag
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Bounds of Postgres integer and real; a cursor value outside them would
+# only fail later, in the database driver.
+INT4_RANGE = (-(2**31), 2**31 - 1)
+REAL_MAX = 3.4028234663852886e38
+
+
+def _cursor_value_ok(key, value):
+    # Keys are integer ids/counts or float scores.
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    try:
+        integer = key.type.python_type is int
+    except NotImplementedError:
+        integer = False
+    if integer:
+        return isinstance(value, int) and INT4_RANGE[0] <= value <= INT4_RANGE[1]
+    return math.isfinite(value) and abs(value) <= REAL_MAX
+
+
+def decode_cursor(cursor: str, keys):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != len(keys)
+        or not all(map(_cursor_value_ok, keys, values))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor: {cursor}",
+        )
+    return values
+
+
+async def count_rows(db, query, mode: str):
+    # "exact" runs COUNT(*) over the filtered query, "estimated" reads the
+    # planner's row estimate without running it, and "cached" keeps exact
+    # counts per compiled filter for total_count_cache_ttl_seconds.
+    if mode == "estimated":
+        plan = await db.scalar(Explain(query))
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    count_query = select(func.count()).select_from(query.subquery())
+    if mode == "exact":
+        return await db.scalar(count_query)
+
+    compiled = query.compile(dialect=postgresql.dialect())
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    cache = count_caches[query.column_descriptions[0]["entity"]]
+    total = cache.get(key)
+    if total is None:
+        total = await db.scalar(count_query)
+        cache.set(key, total)
+    return total
+
+
+def _set_next_page(response: Response, request: Request, rows, keys, tail, limit):
+    # `rows` holds up to limit + 1 rows whose last `tail` columns start with
+    # the keys; an extra row means there is a next page.
+    if len(rows) <= limit or not limit:
+        return
+    start = len(rows[limit - 1]) - tail
+    next_cursor = encode_cursor(rows[limit - 1][start : start + len(keys)])
+    response.headers["X-Next-Cursor"] = next_cursor
+    if request is not None:
+        url = request.url.remove_query_params("skip").include_query_params(
+            cursor=next_cursor
+        )
+        response.headers["Link"] = f'<{url}>; rel="next"'
+
+
+async def paginate(
+    db,
+    query,
+    keys,
+    response: Response,
+    limit: int,
+    skip: int = 0,
+    cursor: str = None,
+    descending: bool = False,
+    request: Request = None,
+    total: str = None,
+    *,
+    options=(),
+    versions=(),
+    etag_parts=(),
+):
+    # Rows are ordered by `keys`, which must be unique together. With a cursor
+    # the page starts right after the last key seen, so it costs the same at any
+    # depth; `skip` is still honoured when no cursor is given.
+    #
+    # With `versions` (row-version columns, see etag.recipe_version_columns)
+    # the page's ETag is derived from its keys and versions. A conditional
+    # request first reads only those, and gets None back when the ETag still
+    # matches, before any entity is loaded or serialized.
+    limit = max(0, min(limit, settings.max_page_limit))
+    if total:
+        response.headers["X-Total-Count"] = str(await count_rows(db, query, total))
+    query = query.order_by(*[key.desc() if descending else key for key in keys])
+
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        if len(keys) == 1:
+            row, bound = keys[0], values[0]
+        else:
+            row, bound = tuple_(*keys), tuple_(*values)
+        query = query.where(row < bound if descending else row > bound)
+    elif skip:
+        query = query.offset(skip)
+
+    tail = len(keys) + len(versions)
+    if versions and request is not None and request.headers.get("if-none-match"):
+        probe = (
+            await db.execute(
+                query.with_only_columns(
+                    *keys, *versions, maintain_column_froms=True
+                ).limit(limit + 1)
+            )
+        ).all()
+        etag = make_etag(*etag_parts, [tuple(row) for row in probe[:limit]])
+        if etag_matches(request, etag):
+            _set_next_page(response, request, probe, keys, tail, limit)
+            response.headers["ETag"] = etag
+            return None
+
+    rows = (
+        await db.execute(
+            query.options(*options).add_columns(*keys, *versions).limit(limit + 1)
+        )
+    ).all()
+    page = rows[:limit]
+    _set_next_page(response, request, rows, keys, tail, limit)
+    if versions:
+        response.headers["ETag"] = make_etag(
+            *etag_parts, [tuple(row[-tail:]) for row in page]
+        )
+
+    width = len(rows[0]) - tail if rows else 1
+    if width == 1:
+        return [row[0] for row in page]
+    return [tuple(row[:width]) for row in page]
@@ -0,0 +1,71 @@
+import logging
+import os
+import sys
+
+from greenlet import getcurrent
+from sqlalchemy import event
+
+from .config import settings
+from .database import async_engine, replica_engines
+from .metrics import current_request
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class QueryGuardError(RuntimeError):
+    pass
+
+
+def _call_site():
+    # Engine events run in SQLAlchemy's greenlet; the awaiting route code is
+    # on the parent greenlet's stack, so look there for the first app frame.
+    frames = [sys._getframe()]
+    parent = getcurrent().parent
+    if parent is not None and parent.gr_frame is not None:
+        frames.append(parent.gr_frame)
+    for frame in frames:
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(APP_DIR) and filename != __file__:
+                path = os.path.relpath(filename, os.path.dirname(APP_DIR))
+                return f"{path}:{frame.f_lineno} in {frame.f_code.co_name}"
+            frame = frame.f_back
+    return "unknown call site"
+
+
+def _report(stats, problem, statement):
+    route = stats.scope.get("route")
+    message = (
+        f"{stats.scope['method']} {route.path if route else stats.scope['path']} "
+        f"{problem} at {_call_site()}: {' '.join(statement.split())[:300]}"
+    )
+    if settings.query_guard == "raise":
+        raise QueryGuardError(message)
+    logger.warning(message)
+
+
+def _check_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is None:
+        return
+    route = stats.scope.get("route")
+    key = f"{stats.scope['method']} {route.path}" if route else None
+    budget = settings.query_budgets.get(key, settings.query_budget)
+    if budget < 0:
+        return
+
+    if stats.statements is None:
+        stats.statements = {}
+    count = stats.statements[statement] = stats.statements.get(statement, 0) + 1
+    if count == settings.query_repeat_limit + 1:
+        _report(stats, f"ran the same statement {count} times", statement)
+    # `stats.queries` counts finished statements, so this one is queries + 1.
+    if stats.queries == budget:
+        _report(stats, f"exceeded its budget of {budget} queries", statement)
+
+
+if settings.query_guard != "off":
+    for _engine in [async_engine, *replica_engines.values()]:
+        event.listen(_engine.sync_engine, "before_cursor_execute", _check_statement)
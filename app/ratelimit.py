@@ -0,0 +1,134 @@
+import ipaddress
+import json
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from .config import settings
+from .oauth2 import token_user_id
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class BucketStore(ABC):
+    # A shared store (e.g. Redis) only needs to implement `take`.
+    @abstractmethod
+    async def take(self, key, rate: float, burst: float, cost: float = 1):
+        # Returns 0 when `cost` tokens were taken from the bucket at `key`,
+        # otherwise the seconds until they would be available.
+        ...
+
+
+class MemoryBucketStore(BucketStore):
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key, rate: float, burst: float, cost: float = 1):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+def _trusted_networks(entries):
+    return [
+        ipaddress.ip_network(entry, strict=False) for entry in entries if entry != "*"
+    ]
+
+
+def _is_trusted(host, networks):
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_ip(scope, networks, trust_any_peer: bool = False):
+    # Walks X-Forwarded-For from the right, past our own proxies, to the first
+    # address a proxy we trust saw connect. Entries further left are supplied
+    # by the client and could be forged.
+    peer = scope["client"][0] if scope.get("client") else None
+    if peer is None or not (trust_any_peer or _is_trusted(peer, networks)):
+        return peer
+    forwarded = [
+        value.decode("latin-1")
+        for name, value in scope["headers"]
+        if name == b"x-forwarded-for"
+    ]
+    hosts = [host.strip() for host in ",".join(forwarded).split(",") if host.strip()]
+    for host in reversed(hosts):
+        if not _is_trusted(host, networks):
+            return host
+    return hosts[0] if hosts else peer
+
+
+def _bearer_token(scope):
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return token
+    return None
+
+
+class RateLimitMiddleware:
+    # Authenticated requests are limited per user, anonymous ones per client
+    # IP, each with separate read and write budgets.
+    def __init__(self, app, store: BucketStore = None):
+        self.app = app
+        self.store = store or MemoryBucketStore(settings.rate_limit_max_buckets)
+        self.trusted_networks = _trusted_networks(settings.forwarded_allow_ips)
+        self.trust_any_peer = "*" in settings.forwarded_allow_ips
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.rate_limit_enabled:
+            return await self.app(scope, receive, send)
+
+        if scope["method"] in READ_METHODS:
+            kind = "read"
+            rate = settings.rate_limit_read_per_second
+            burst = settings.rate_limit_read_burst
+        else:
+            kind = "write"
+            rate = settings.rate_limit_write_per_second
+            burst = settings.rate_limit_write_burst
+
+        token = _bearer_token(scope)
+        user_id = token_user_id(token) if token else None
+        if user_id is not None:
+            key = ("user", user_id, kind)
+        else:
+            client = client_ip(scope, self.trusted_networks, self.trust_any_peer)
+            key = ("ip", client, kind)
+
+        wait = await self.store.take(key, rate, burst)
+        if not wait:
+            return await self.app(scope, receive, send)
+
+        body = json.dumps({"detail": "Rate limit exceeded"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(wait)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
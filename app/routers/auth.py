@@ -1,22 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, oauth2, schemas, utils
 from ..database import get_db
+from ..metrics import MetricsRoute
 
-router = APIRouter(tags=["Authentication"])
+router = APIRouter(tags=["Authentication"], route_class=MetricsRoute)
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = (
-        db.query(models.User)
-        .filter(models.User.email == user_credentials.username)
-        .first()
+    user = await db.scalar(
+        select(models.User).where(models.User.email == user_credentials.username)
     )
 
     if not user:
@@ -24,11 +24,18 @@ def login(
             status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials"
         )
 
-    if not utils.verify(user_credentials.password, user.password):
+    verified, new_hash = await utils.verify_and_update_async(
+        user_credentials.password, user.password
+    )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=f"Invalid Credentials"
         )
 
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
     access_token = oauth2.create_access_token(data={"user_id": user.id})
 
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,37 +1,65 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
-
-from app.helperFunctions import insert_categories, insert_cusine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.helperFunctions import (
+    author_breakdown,
+    insert_categories,
+    insert_cusine,
+    load_recipe,
+    recipe_load_options,
+)
 
 from .. import models, oauth2, schemas
-from ..database import get_db
+from ..cache import (
+    forget,
+    get_reference,
+    invalidate_counts,
+    invalidate_recipe_caches,
+    remember,
+)
+from ..database import get_db, get_read_db
+from ..etag import json_response, not_modified, recipe_version_columns
+from ..metrics import MetricsRoute
+from ..pagination import paginate
+from ..search import fuzzy_search
+from ..serializers import parse_recipe_fields
 
-router = APIRouter(prefix="/authors", tags=["Authors"])
+router = APIRouter(prefix="/authors", tags=["Authors"], route_class=MetricsRoute)
 
 
 @router.get("/", response_model=List[schemas.AuthorOut])
-def get_authors(
-    db: Session = Depends(get_db),
+async def get_authors(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     limit: int = 100,
     skip: int = 0,
+    cursor: Optional[str] = None,
     search: Optional[str] = "",
+    search_mode: Literal["substring", "fuzzy"] = "substring",
+    total: Optional[Literal["exact", "estimated", "cached"]] = None,
 ):
-    authors = (
-        db.query(models.Author)
-        .filter(models.Author.name.ilike(f"%{search}%"))
-        .limit(limit)
-        .offset(skip)
-        .all()
+    query = select(models.Author)
+    keys, descending = [models.Author.author_id], False
+    if search_mode == "fuzzy" and search:
+        query, score = await fuzzy_search(db, query, models.Author.name, search)
+        keys, descending = [score, models.Author.author_id], True
+    else:
+        query = query.where(models.Author.name.ilike(f"%{search}%"))
+
+    authors = await paginate(
+        db, query, keys, response, limit, skip, cursor, descending, request, total
     )
     return authors
 
 
 @router.get("/{id}", response_model=schemas.AuthorOut)
-def get_author(id: int, db: Session = Depends(get_db)):
-    author = db.query(models.Author).filter(models.Author.author_id == id).first()
+async def get_author(id: int, db: AsyncSession = Depends(get_read_db)):
+    author = await get_reference(db, models.Author, id)
     if not author:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,14 +69,13 @@ def get_author(id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{id}", response_model=schemas.AuthorOut)
-def update_author(
+async def update_author(
     id: int,
     updated_author: schemas.Author,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    author_query = db.query(models.Author).filter(models.Author.author_id == id)
-    author = author_query.first()
+    author = await db.scalar(select(models.Author).where(models.Author.author_id == id))
     if not author:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -62,9 +89,11 @@ def update_author(
         )
     updated_author.name = author.name
     try:
-        author_query.update(updated_author.model_dump(), synchronize_session=False)
-        db.commit()
-        return author_query.first()
+        for key, value in updated_author.model_dump().items():
+            setattr(author, key, value)
+        await db.commit()
+        forget(models.Author, id)
+        return author
     except IntegrityError as e:
         if "unique constraint" in str(e):
             raise HTTPException(
@@ -79,13 +108,12 @@ def update_author(
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_author(
+async def delete_author(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    author_query = db.query(models.Author).filter(models.Author.author_id == id)
-    author = author_query.first()
+    author = await db.scalar(select(models.Author).where(models.Author.author_id == id))
     if not author:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -97,26 +125,30 @@ def delete_author(
             detail=f"Not authorized to perform requested action",
         )
 
-    db.query(models.Recipe).filter(models.Recipe.author_id == id).update(
-        {"author_id": None}
+    await db.execute(
+        update(models.Recipe)
+        .where(models.Recipe.author_id == id)
+        .values(author_id=None)
     )
-    db.delete(author)
-    db.commit()
+    await db.delete(author)
+    await db.commit()
+    forget(models.Author, id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.AuthorOut)
-def add_author(
+async def add_author(
     author: schemas.Author,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
     new_author = models.Author(owner_id=current_user.id, **author.model_dump())
     db.add(new_author)
     try:
-        db.commit()
-        db.refresh(new_author)
-        return new_author
+        await db.commit()
+        await db.refresh(new_author)
+        invalidate_counts(models.Author)
+        return remember(new_author)
     except IntegrityError as e:
         if "unique constraint" in str(e):
             raise HTTPException(
@@ -131,52 +163,97 @@ def add_author(
 
 
 @router.get("/{id}/recipes", response_model=List[schemas.RecipeOutDB])
-def get_author_recipes(
+async def get_author_recipes(
     id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     limit: int = 10,
     skip: int = 0,
+    cursor: Optional[str] = None,
     search: Optional[str] = "",
+    fields: Optional[str] = None,
+    total: Optional[Literal["exact", "estimated", "cached"]] = None,
 ):
-    author = db.query(models.Author).filter(models.Author.author_id == id).first()
+    fields = parse_recipe_fields(fields)
+    author = await get_reference(db, models.Author, id)
     if not author:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Author with id: {id} was not found",
         )
-    recipes = (
-        db.query(models.Recipe)
-        .filter(models.Recipe.author_id == id)
-        .filter(models.Recipe.name.ilike(f"%{search}%"))
-        .limit(limit)
-        .offset(skip)
-        .all()
+    query = (
+        select(models.Recipe)
+        .where(models.Recipe.author_id == id)
+        .where(models.Recipe.name.ilike(f"%{search}%"))
     )
-    return recipes
-
-
-@router.get("/{id}/categories", response_model=List[schemas.CategoryOut])
-def get_author_categories(id: int, db: Session = Depends(get_db)):
-    author = db.query(models.Author).filter(models.Author.author_id == id).first()
-    if not author:
+    recipes = await paginate(
+        db,
+        query,
+        [models.Recipe.recipe_id],
+        response,
+        limit,
+        skip,
+        cursor,
+        request=request,
+        total=total,
+        options=recipe_load_options(fields=fields),
+        versions=recipe_version_columns(),
+        etag_parts=(tuple(sorted(fields or ())),),
+    )
+    if recipes is None:
+        return not_modified(response.headers["ETag"], dict(response.headers))
+    return json_response(request, response, List[schemas.RecipeOutDB], recipes, fields)
+
+
+@router.get("/{id}/categories", response_model=List[schemas.AuthorCategoryOut])
+async def get_author_categories(id: int, db: AsyncSession = Depends(get_read_db)):
+    categories = await author_breakdown(
+        db,
+        id,
+        models.author_category_stats,
+        models.Category,
+        models.Category.category_id,
+    )
+    if not categories and not await get_reference(db, models.Author, id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Author with id: {id} was not found",
         )
+    return categories
 
-    categories = (
-        db.query(models.Category)
-        .join(
-            models.recipe_category,
-            models.Category.category_id == models.recipe_category.c.category_id,
-        )
-        .join(
-            models.Recipe, models.Recipe.recipe_id == models.recipe_category.c.recipe_id
+
+@router.get("/{id}/stats", response_model=schemas.AuthorStats)
+async def get_author_stats(id: int, db: AsyncSession = Depends(get_read_db)):
+    recipe_count = await db.scalar(
+        select(models.author_stats.c.recipe_count).where(
+            models.author_stats.c.author_id == id
         )
-        .filter(models.Recipe.author_id == id)
-        .all()
     )
-    return categories
+    if recipe_count is None:
+        if not await get_reference(db, models.Author, id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Author with id: {id} was not found",
+            )
+        return {"author_id": id, "recipe_count": 0, "categories": [], "cuisines": []}
+
+    categories = await author_breakdown(
+        db,
+        id,
+        models.author_category_stats,
+        models.Category,
+        models.Category.category_id,
+    )
+    cuisines = await author_breakdown(
+        db, id, models.author_cuisine_stats, models.Cuisine, models.Cuisine.cuisine_id
+    )
+    return {
+        "author_id": id,
+        "recipe_count": recipe_count,
+        "categories": categories,
+        "cuisines": cuisines,
+    }
 
 
 @router.post(
@@ -184,23 +261,23 @@ def get_author_categories(id: int, db: Session = Depends(get_db)):
     status_code=status.HTTP_201_CREATED,
     response_model=schemas.RecipeOutDB,
 )
-def add_author_recipe(
+async def add_author_recipe(
     id: int,
     recipe: schemas.Recipe,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    author = db.query(models.Author).filter(models.Author.author_id == id).first()
+    author = await db.scalar(select(models.Author).where(models.Author.author_id == id))
     if not author:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Author with id: {id} was not found",
         )
 
-    recipe_found = (
-        db.query(models.Recipe)
-        .filter(models.Recipe.name == recipe.name, models.Recipe.author_id == id)
-        .first()
+    recipe_found = await db.scalar(
+        select(models.Recipe).where(
+            models.Recipe.name == recipe.name, models.Recipe.author_id == id
+        )
     )
     if recipe_found:
         raise HTTPException(
@@ -208,9 +285,9 @@ def add_author_recipe(
             detail=f"The Recipe, {recipe.name}, by {author.name} already exists",
         )
 
-    cuisine_id = insert_cusine(recipe.cuisine, db, current_user)
+    cuisine_id = await insert_cusine(recipe.cuisine, db, current_user)
     author_id = author.author_id
-    categories = insert_categories(recipe.category, db, current_user)
+    categories = await insert_categories(recipe.category, db, current_user)
 
     recipe_in = schemas.RecipeInDB(
         **recipe.model_dump(), cuisine_id=cuisine_id, author_id=author_id
@@ -224,28 +301,29 @@ def add_author_recipe(
         new_recipe = models.Recipe(owner_id=current_user.id, **recipe_in.model_dump())
 
     db.add(new_recipe)
-    db.commit()
-    db.refresh(new_recipe)
-    return new_recipe
+    await db.commit()
+    invalidate_recipe_caches()
+    return await load_recipe(db, new_recipe.recipe_id)
 
 
 @router.put("/{authorId}/recipes/{recipeId}", response_model=schemas.RecipeOutDB)
-def update_author_recipe(
+async def update_author_recipe(
     authorId: int,
     recipeId: int,
     updated_recipe: schemas.Recipe,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    author = db.query(models.Author).filter(models.Author.author_id == authorId).first()
+    author = await db.scalar(
+        select(models.Author).where(models.Author.author_id == authorId)
+    )
     if not author:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Author with id: {authorId} was not found",
         )
 
-    recipe_query = db.query(models.Recipe).filter(models.Recipe.recipe_id == recipeId)
-    recipe = recipe_query.first()
+    recipe = await load_recipe(db, recipeId)
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -259,39 +337,44 @@ def update_author_recipe(
         )
 
     updated_recipe.name = recipe.name
-    cuisine_id = insert_cusine(updated_recipe.cuisine, db, current_user)
+    cuisine_id = await insert_cusine(updated_recipe.cuisine, db, current_user)
     author_id = authorId
-    categories = insert_categories(updated_recipe.category, db, current_user)
+    categories = await insert_categories(updated_recipe.category, db, current_user)
 
     updated_recipe_in = schemas.RecipeInDB(
         **updated_recipe.model_dump(), cuisine_id=cuisine_id, author_id=author_id
     )
 
-    recipe_query.update(updated_recipe_in.model_dump(), synchronize_session=False)
+    for key, value in updated_recipe_in.model_dump().items():
+        setattr(recipe, key, value)
     if categories:
-        recipe_query.first().categories = categories
+        recipe.categories = categories
     elif not categories:
-        recipe_query.first().categories = []
-    db.commit()
-    return recipe_query.first()
+        recipe.categories = []
+    await db.commit()
+    invalidate_recipe_caches()
+    return await load_recipe(db, recipeId)
 
 
 @router.delete("/{authorId}/recipes/{recipeId}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_author_recipe(
+async def delete_author_recipe(
     authorId: int,
     recipeId: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    author = db.query(models.Author).filter(models.Author.author_id == authorId).first()
+    author = await db.scalar(
+        select(models.Author).where(models.Author.author_id == authorId)
+    )
     if not author:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Author with id: {authorId} was not found",
         )
 
-    recipe_query = db.query(models.Recipe).filter(models.Recipe.recipe_id == recipeId)
-    recipe = recipe_query.first()
+    recipe = await db.scalar(
+        select(models.Recipe).where(models.Recipe.recipe_id == recipeId)
+    )
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -304,6 +387,7 @@ def delete_author_recipe(
             detail=f"Not authorized to perform requested action",
         )
 
-    db.delete(recipe)
-    db.commit()
+    await db.delete(recipe)
+    await db.commit()
+    invalidate_recipe_caches()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,37 +1,49 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, oauth2, schemas
-from ..database import get_db
+from ..cache import forget, get_reference, invalidate_counts, remember
+from ..database import get_db, get_read_db
+from ..metrics import MetricsRoute
+from ..pagination import paginate
+from ..search import fuzzy_search
 
-router = APIRouter(prefix="/categories", tags=["Categories"])
+router = APIRouter(prefix="/categories", tags=["Categories"], route_class=MetricsRoute)
 
 
 @router.get("/", response_model=List[schemas.CategoryOut])
-def get_categories(
-    db: Session = Depends(get_db),
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     limit: int = 100,
     skip: int = 0,
+    cursor: Optional[str] = None,
     search: Optional[str] = "",
+    search_mode: Literal["substring", "fuzzy"] = "substring",
+    total: Optional[Literal["exact", "estimated", "cached"]] = None,
 ):
-    categories = (
-        db.query(models.Category)
-        .filter(models.Category.name.ilike(f"%{search}%"))
-        .limit(limit)
-        .offset(skip)
-        .all()
+    query = select(models.Category)
+    keys, descending = [models.Category.category_id], False
+    if search_mode == "fuzzy" and search:
+        query, score = await fuzzy_search(db, query, models.Category.name, search)
+        keys, descending = [score, models.Category.category_id], True
+    else:
+        query = query.where(models.Category.name.ilike(f"%{search}%"))
+
+    categories = await paginate(
+        db, query, keys, response, limit, skip, cursor, descending, request, total
     )
     return categories
 
 
 @router.get("/{id}", response_model=schemas.CategoryOut)
-def get_category(id: int, db: Session = Depends(get_db)):
-    category = (
-        db.query(models.Category).filter(models.Category.category_id == id).first()
-    )
+async def get_category(id: int, db: AsyncSession = Depends(get_read_db)):
+    category = await get_reference(db, models.Category, id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,14 +53,15 @@ def get_category(id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{id}", response_model=schemas.CategoryOut)
-def update_category(
+async def update_category(
     id: int,
     updated_category: schemas.Category,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    category_query = db.query(models.Category).filter(models.Category.category_id == id)
-    category = category_query.first()
+    category = await db.scalar(
+        select(models.Category).where(models.Category.category_id == id)
+    )
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -60,9 +73,11 @@ def update_category(
             detail=f"Not authorized to perform requested action",
         )
     try:
-        category_query.update(updated_category.model_dump(), synchronize_session=False)
-        db.commit()
-        return category_query.first()
+        for key, value in updated_category.model_dump().items():
+            setattr(category, key, value)
+        await db.commit()
+        forget(models.Category, id)
+        return category
     except IntegrityError as e:
         if "unique constraint" in str(e):
             raise HTTPException(
@@ -77,13 +92,14 @@ def update_category(
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(
+async def delete_category(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    category_query = db.query(models.Category).filter(models.Category.category_id == id)
-    category = category_query.first()
+    category = await db.scalar(
+        select(models.Category).where(models.Category.category_id == id)
+    )
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -94,25 +110,27 @@ def delete_category(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"Not authorized to perform requested action",
         )
-    db.delete(category)
-    db.commit()
+    await db.delete(category)
+    await db.commit()
+    forget(models.Category, id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post(
     "/", status_code=status.HTTP_201_CREATED, response_model=schemas.CategoryOut
 )
-def add_category(
+async def add_category(
     category: schemas.Category,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
     new_category = models.Category(owner_id=current_user.id, **category.model_dump())
     db.add(new_category)
     try:
-        db.commit()
-        db.refresh(new_category)
-        return new_category
+        await db.commit()
+        await db.refresh(new_category)
+        invalidate_counts(models.Category)
+        return remember(new_category)
     except IntegrityError as e:
         if "unique constraint" in str(e):
             raise HTTPException(
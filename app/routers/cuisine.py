@@ -1,35 +1,49 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, oauth2, schemas
-from ..database import get_db
+from ..cache import forget, get_reference, invalidate_counts, remember
+from ..database import get_db, get_read_db
+from ..metrics import MetricsRoute
+from ..pagination import paginate
+from ..search import fuzzy_search
 
-router = APIRouter(prefix="/cuisines", tags=["Cuisines"])
+router = APIRouter(prefix="/cuisines", tags=["Cuisines"], route_class=MetricsRoute)
 
 
 @router.get("/", response_model=List[schemas.CuisineOut])
-def get_cuisines(
-    db: Session = Depends(get_db),
+async def get_cuisines(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     limit: int = 100,
     skip: int = 0,
+    cursor: Optional[str] = None,
     search: Optional[str] = "",
+    search_mode: Literal["substring", "fuzzy"] = "substring",
+    total: Optional[Literal["exact", "estimated", "cached"]] = None,
 ):
-    cuisines = (
-        db.query(models.Cuisine)
-        .filter(models.Cuisine.name.ilike(f"%{search}%"))
-        .limit(limit)
-        .offset(skip)
-        .all()
+    query = select(models.Cuisine)
+    keys, descending = [models.Cuisine.cuisine_id], False
+    if search_mode == "fuzzy" and search:
+        query, score = await fuzzy_search(db, query, models.Cuisine.name, search)
+        keys, descending = [score, models.Cuisine.cuisine_id], True
+    else:
+        query = query.where(models.Cuisine.name.ilike(f"%{search}%"))
+
+    cuisines = await paginate(
+        db, query, keys, response, limit, skip, cursor, descending, request, total
     )
     return cuisines
 
 
 @router.get("/{id}", response_model=schemas.CuisineOut)
-def get_cuisine(id: int, db: Session = Depends(get_db)):
-    cuisine = db.query(models.Cuisine).filter(models.Cuisine.cuisine_id == id).first()
+async def get_cuisine(id: int, db: AsyncSession = Depends(get_read_db)):
+    cuisine = await get_reference(db, models.Cuisine, id)
     if not cuisine:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -39,14 +53,15 @@ def get_cuisine(id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{id}", response_model=schemas.CuisineOut)
-def update_cuisine(
+async def update_cuisine(
     id: int,
     updated_cuisine: schemas.Cuisine,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    cuisine_query = db.query(models.Cuisine).filter(models.Cuisine.cuisine_id == id)
-    cuisine = cuisine_query.first()
+    cuisine = await db.scalar(
+        select(models.Cuisine).where(models.Cuisine.cuisine_id == id)
+    )
     if not cuisine:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -60,9 +75,11 @@ def update_cuisine(
         )
 
     try:
-        cuisine_query.update(updated_cuisine.model_dump(), synchronize_session=False)
-        db.commit()
-        return cuisine_query.first()
+        for key, value in updated_cuisine.model_dump().items():
+            setattr(cuisine, key, value)
+        await db.commit()
+        forget(models.Cuisine, id)
+        return cuisine
     except IntegrityError as e:
         if "unique constraint" in str(e):
             raise HTTPException(
@@ -77,13 +94,14 @@ def update_cuisine(
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_cuisine(
+async def delete_cuisine(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    cuisine_query = db.query(models.Cuisine).filter(models.Cuisine.cuisine_id == id)
-    cuisine = cuisine_query.first()
+    cuisine = await db.scalar(
+        select(models.Cuisine).where(models.Cuisine.cuisine_id == id)
+    )
     if not cuisine:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,30 +114,32 @@ def delete_cuisine(
             detail=f"Not authorized to perform requested action",
         )
 
-    recipes_with_cuisine = (
-        db.query(models.Recipe).filter(models.Recipe.cuisine_id == id).all()
+    await db.execute(
+        update(models.Recipe)
+        .where(models.Recipe.cuisine_id == id)
+        .values(cuisine_id=None)
     )
-    for recipe in recipes_with_cuisine:
-        recipe.cuisine_id = None
-    db.delete(cuisine)
-    db.commit()
+    await db.delete(cuisine)
+    await db.commit()
+    forget(models.Cuisine, id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post(
     "/", status_code=status.HTTP_201_CREATED, response_model=schemas.CuisineOut
 )
-def add_cusine(
+async def add_cusine(
     cuisine: schemas.Cuisine,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
     new_cuisine = models.Cuisine(owner_id=current_user.id, **cuisine.model_dump())
     db.add(new_cuisine)
     try:
-        db.commit()
-        db.refresh(new_cuisine)
-        return new_cuisine
+        await db.commit()
+        await db.refresh(new_cuisine)
+        invalidate_counts(models.Cuisine)
+        return remember(new_cuisine)
     except IntegrityError as e:
         if "unique constraint" in str(e):
             raise HTTPException(
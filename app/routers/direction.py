@@ -1,32 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, oauth2, schemas
-from ..database import get_db
+from ..database import get_db, get_read_db
+from ..etag import etag_matches, make_etag, not_modified, recipe_version
+from ..metrics import MetricsRoute
 
-router = APIRouter(prefix="/recipes", tags=["Directions"])
+router = APIRouter(prefix="/recipes", tags=["Directions"], route_class=MetricsRoute)
 
 
 @router.get("/{id}/direction")
-def get_recipe_direction(id: int, db: Session = Depends(get_db)):
-    recipe = db.query(models.Recipe).filter(models.Recipe.recipe_id == id).first()
-    if not recipe:
+async def get_recipe_direction(
+    id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
+    version = await recipe_version(db, id)
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Recipe with id: {id} was not found",
         )
-    return recipe.direction
+    etag = make_etag("direction", *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return await db.scalar(
+        select(models.Recipe.direction).where(models.Recipe.recipe_id == id)
+    )
 
 
 @router.put("/{id}/direction")
-def update_recipe_direction(
+async def update_recipe_direction(
     id: int,
     updated_direction: schemas.Direction,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    recipe_query = db.query(models.Recipe).filter(models.Recipe.recipe_id == id)
-    recipe = recipe_query.first()
+    recipe = await db.scalar(select(models.Recipe).where(models.Recipe.recipe_id == id))
 
     if not recipe:
         raise HTTPException(
@@ -46,21 +59,18 @@ def update_recipe_direction(
             detail=f"Empty direction. Please provide valid data.",
         )
     else:
-        recipe_query.update(
-            {"direction": updated_direction.direction}, synchronize_session=False
-        )
-        db.commit()
-        return recipe_query.first().direction
+        recipe.direction = updated_direction.direction
+        await db.commit()
+        return recipe.direction
 
 
 @router.delete("/{id}/direction", status_code=status.HTTP_204_NO_CONTENT)
-def delete_recipe_ingredients(
+async def delete_recipe_ingredients(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    recipe_query = db.query(models.Recipe).filter(models.Recipe.recipe_id == id)
-    recipe = recipe_query.first()
+    recipe = await db.scalar(select(models.Recipe).where(models.Recipe.recipe_id == id))
 
     if not recipe:
         raise HTTPException(
@@ -74,6 +84,6 @@ def delete_recipe_ingredients(
             detail=f"Not authorized to perform requested action",
         )
 
-    recipe_query.update({"direction": None}, synchronize_session=False)
-    db.commit()
+    recipe.direction = None
+    await db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
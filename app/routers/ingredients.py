@@ -1,32 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, oauth2, schemas
-from ..database import get_db
+from ..cache import invalidate_recipe_caches
+from ..database import get_db, get_read_db
+from ..etag import etag_matches, make_etag, not_modified, recipe_version
+from ..metrics import MetricsRoute
 
-router = APIRouter(prefix="/recipes", tags=["Ingredients"])
+router = APIRouter(prefix="/recipes", tags=["Ingredients"], route_class=MetricsRoute)
 
 
 @router.get("/{id}/ingredients")
-def get_recipe_ingredients(id: int, db: Session = Depends(get_db)):
-    recipe = db.query(models.Recipe).filter(models.Recipe.recipe_id == id).first()
-    if not recipe:
+async def get_recipe_ingredients(
+    id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+):
+    version = await recipe_version(db, id)
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Recipe with id: {id} was not found",
         )
-    return recipe.ingredients
+    etag = make_etag("ingredients", *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return await db.scalar(
+        select(models.Recipe.ingredients).where(models.Recipe.recipe_id == id)
+    )
 
 
 @router.put("/{id}/ingredients")
-def update_recipe_ingredients(
+async def update_recipe_ingredients(
     id: int,
     updated_ingredients: schemas.Ingredients,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    recipe_query = db.query(models.Recipe).filter(models.Recipe.recipe_id == id)
-    recipe = recipe_query.first()
+    recipe = await db.scalar(select(models.Recipe).where(models.Recipe.recipe_id == id))
 
     if not recipe:
         raise HTTPException(
@@ -40,8 +54,7 @@ def update_recipe_ingredients(
             detail=f"Not authorized to perform requested action",
         )
 
-    recipe_query.update(
-        {"ingredients": updated_ingredients.ingredients}, synchronize_session=False
-    )
-    db.commit()
-    return recipe_query.first().ingredients
+    recipe.ingredients = updated_ingredients.ingredients
+    await db.commit()
+    invalidate_recipe_caches()
+    return recipe.ingredients
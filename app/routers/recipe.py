@@ -1,59 +1,197 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Response, status
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.helperFunctions import insert_author, insert_categories, insert_cusine
+from app.helperFunctions import (
+    export_recipes,
+    insert_author,
+    insert_categories,
+    insert_cusine,
+    insert_recipe_batch,
+    iter_lines,
+    load_recipe,
+    recipe_load_options,
+)
 
 from .. import models, oauth2, schemas
-from ..database import get_db
+from ..cache import facet_cache, invalidate_recipe_caches
+from ..config import settings
+from ..database import get_db, get_read_db
+from ..etag import (
+    etag_matches,
+    json_response,
+    make_etag,
+    not_modified,
+    recipe_version,
+    recipe_version_columns,
+)
+from ..metrics import MetricsRoute
+from ..pagination import paginate
+from ..search import ingredient_coverage, recipe_facets, recipe_search
+from ..serializers import parse_recipe_fields, render
 
-router = APIRouter(prefix="/recipes", tags=["Recipes"])
+router = APIRouter(prefix="/recipes", tags=["Recipes"], route_class=MetricsRoute)
 
 
 @router.get("/", response_model=List[schemas.RecipeOutDB])
-def get_recipes(
-    db: Session = Depends(get_db),
+async def get_recipes(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     limit: int = 10,
     skip: int = 0,
+    cursor: Optional[str] = None,
     search: Optional[str] = "",
+    search_mode: Literal["substring", "fulltext", "fuzzy"] = "substring",
     author: Optional[str] = "",
     cuisine: Optional[str] = "",
+    fields: Optional[str] = None,
+    total: Optional[Literal["exact", "estimated", "cached"]] = None,
 ):
-    recipes = (
-        db.query(models.Recipe)
+    fields = parse_recipe_fields(fields)
+    query = (
+        select(models.Recipe)
         .join(models.Author, models.Author.author_id == models.Recipe.author_id)
         .join(models.Cuisine, models.Cuisine.cuisine_id == models.Recipe.cuisine_id)
-        .filter(models.Recipe.name.ilike(f"%{search}%"))
-        .filter(models.Author.name.ilike(f"%{author}%"))
-        .filter(models.Cuisine.name.ilike(f"%{cuisine}%"))
-        .limit(limit)
-        .offset(skip)
-        .all()
     )
+    query, keys, descending = await recipe_search(
+        db, query, search, search_mode, author, cuisine
+    )
+    recipes = await paginate(
+        db,
+        query,
+        keys,
+        response,
+        limit,
+        skip,
+        cursor,
+        descending,
+        request,
+        total,
+        options=recipe_load_options(joined=True, fields=fields),
+        versions=recipe_version_columns(),
+        etag_parts=(tuple(sorted(fields or ())),),
+    )
+    if recipes is None:
+        return not_modified(response.headers["ETag"], dict(response.headers))
+    return json_response(request, response, List[schemas.RecipeOutDB], recipes, fields)
+
+
+@router.get("/by-ingredients", response_model=List[schemas.RecipeMatchOut])
+async def get_recipes_by_ingredients(
+    request: Request,
+    response: Response,
+    have: List[str] = Query(),
+    missing_max: int = 0,
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = 10,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+    total: Optional[Literal["exact", "estimated", "cached"]] = None,
+):
+    query, matched, missing = ingredient_coverage(select(models.Recipe), have)
+    query = query.add_columns(matched, missing).where(missing <= missing_max)
+    rows = await paginate(
+        db,
+        query,
+        [missing, -matched, models.Recipe.recipe_id],
+        response,
+        limit,
+        skip,
+        cursor,
+        request=request,
+        total=total,
+        options=recipe_load_options(),
+        versions=recipe_version_columns(),
+    )
+    if rows is None:
+        return not_modified(response.headers["ETag"], dict(response.headers))
+    return json_response(
+        request,
+        response,
+        List[schemas.RecipeMatchOut],
+        [
+            {"recipe": recipe, "matched": matched, "missing": missing}
+            for recipe, matched, missing in rows
+        ],
+    )
+
+
+@router.get("/facets", response_model=schemas.RecipeFacets)
+async def get_recipe_facets(
+    db: AsyncSession = Depends(get_read_db),
+    search: Optional[str] = "",
+    search_mode: Literal["substring", "fulltext", "fuzzy"] = "substring",
+    author: Optional[str] = "",
+    cuisine: Optional[str] = "",
+):
+    key = (search_mode, search or "", author or "", cuisine or "")
+    facets = facet_cache.get(key)
+    if facets is None:
+        facets = await recipe_facets(db, search, search_mode, author, cuisine)
+        facet_cache.set(key, facets)
+    return facets
+
 
-    return recipes
+@router.get("/export")
+async def export_recipe_catalog(format: Literal["ndjson", "csv"] = "ndjson"):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_recipes(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=recipes.{format}"},
+    )
 
 
 @router.get("/{id}", response_model=schemas.RecipeOutDB)
-def get_recipe(id: int, db: Session = Depends(get_db)):
-    recipe = db.query(models.Recipe).filter(models.Recipe.recipe_id == id).first()
-    if not recipe:
+async def get_recipe(
+    id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    fields: Optional[str] = None,
+):
+    fields = parse_recipe_fields(fields)
+    version = await recipe_version(db, id, related=True)
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Recipe with id: {id} was not found",
         )
+    etag = make_etag("recipe", tuple(sorted(fields or ())), *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    recipe = await load_recipe(db, id, fields)
+    if fields is not None or settings.fast_json_responses:
+        return Response(
+            render(schemas.RecipeOutDB, recipe, fields),
+            media_type="application/json",
+            headers=dict(response.headers),
+        )
     return recipe
 
 
 @router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_recipe(
+async def delete_recipe(
     id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    recipe_query = db.query(models.Recipe).filter(models.Recipe.recipe_id == id)
-    recipe = recipe_query.first()
+    recipe = await db.scalar(select(models.Recipe).where(models.Recipe.recipe_id == id))
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -66,21 +204,24 @@ def delete_recipe(
             detail=f"Not authorized to perform requested action",
         )
 
-    db.delete(recipe)
-    db.commit()
+    await db.delete(recipe)
+    await db.commit()
+    invalidate_recipe_caches()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post(
     "/", status_code=status.HTTP_201_CREATED, response_model=schemas.RecipeOutDB
 )
-def add_recipe(
+async def add_recipe(
     recipe: schemas.Recipe,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    recipe_found = (
-        db.query(models.Recipe).filter(models.Recipe.name == recipe.name).first()
+    recipe_found = await db.scalar(
+        select(models.Recipe)
+        .options(joinedload(models.Recipe.author))
+        .where(models.Recipe.name == recipe.name)
     )
     if recipe_found:
         if recipe.author and (recipe_found.author.name == recipe.author):
@@ -89,9 +230,9 @@ def add_recipe(
                 detail=f"The Recipe, {recipe.name}, by {recipe.author} already exists",
             )
 
-    cuisine_id = insert_cusine(recipe.cuisine, db, current_user)
-    author_id = insert_author(recipe.author, db, current_user)
-    categories = insert_categories(recipe.category, db, current_user)
+    cuisine_id = await insert_cusine(recipe.cuisine, db, current_user)
+    author_id = await insert_author(recipe.author, db, current_user)
+    categories = await insert_categories(recipe.category, db, current_user)
 
     recipe_in = schemas.RecipeInDB(
         **recipe.model_dump(), cuisine_id=cuisine_id, author_id=author_id
@@ -105,20 +246,19 @@ def add_recipe(
         new_recipe = models.Recipe(owner_id=current_user.id, **recipe_in.model_dump())
 
     db.add(new_recipe)
-    db.commit()
-    db.refresh(new_recipe)
-    return new_recipe
+    await db.commit()
+    invalidate_recipe_caches()
+    return await load_recipe(db, new_recipe.recipe_id)
 
 
 @router.put("/{id}", response_model=schemas.RecipeOutDB)
-def update_recipe(
+async def update_recipe(
     id: int,
     updated_recipe: schemas.Recipe,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: int = Depends(oauth2.get_current_user),
 ):
-    recipe_query = db.query(models.Recipe).filter(models.Recipe.recipe_id == id)
-    recipe = recipe_query.first()
+    recipe = await load_recipe(db, id)
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -131,18 +271,54 @@ def update_recipe(
             detail=f"Not authorized to perform requested action",
         )
     updated_recipe.name = recipe.name
-    cuisine_id = insert_cusine(updated_recipe.cuisine, db, current_user)
+    cuisine_id = await insert_cusine(updated_recipe.cuisine, db, current_user)
     author_id = recipe.author_id
-    categories = insert_categories(updated_recipe.category, db, current_user)
+    categories = await insert_categories(updated_recipe.category, db, current_user)
 
     updated_recipe_in = schemas.RecipeInDB(
         **updated_recipe.model_dump(), cuisine_id=cuisine_id, author_id=author_id
     )
 
-    recipe_query.update(updated_recipe_in.model_dump(), synchronize_session=False)
+    for key, value in updated_recipe_in.model_dump().items():
+        setattr(recipe, key, value)
     if categories:
-        recipe_query.first().categories = categories
+        recipe.categories = categories
     elif not categories:
-        recipe_query.first().categories = []
-    db.commit()
-    return recipe_query.first()
+        recipe.categories = []
+    await db.commit()
+    invalidate_recipe_caches()
+    return await load_recipe(db, id)
+
+
+@router.post("/import", response_model=schemas.ImportSummary)
+async def import_recipes(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: int = Depends(oauth2.get_current_user),
+):
+    results, batch, line = [], [], 0
+    async for raw in iter_lines(request.stream()):
+        line += 1
+        if not raw.strip():
+            continue
+        try:
+            batch.append((line, schemas.Recipe.model_validate_json(raw)))
+        except ValidationError as e:
+            error = e.errors()[0]
+            results.append(
+                {
+                    "line": line,
+                    "status": "invalid",
+                    "detail": f"{'.'.join(map(str, error['loc']))}: {error['msg']}",
+                }
+            )
+        if len(batch) >= settings.import_batch_size:
+            results.extend(await insert_recipe_batch(batch, db, current_user))
+            batch = []
+    if batch:
+        results.extend(await insert_recipe_batch(batch, db, current_user))
+
+    invalidate_recipe_caches()
+    results.sort(key=lambda result: result["line"])
+    created = sum(result["status"] == "created" for result in results)
+    return {"created": created, "failed": len(results) - created, "results": results}
@@ -0,0 +1,37 @@
+import time
+
+from fastapi import APIRouter
+
+from ..cache import reference_caches
+from ..database import async_engine, pool_stats, replica_down_until, replica_engines
+from ..metrics import MetricsRoute
+from ..startup import report
+
+router = APIRouter(prefix="/stats", tags=["Stats"], route_class=MetricsRoute)
+
+
+@router.get("/cache")
+def get_cache_stats():
+    return {
+        model.__tablename__: cache.stats() for model, cache in reference_caches.items()
+    }
+
+
+@router.get("/pool")
+def get_pool_stats():
+    now = time.monotonic()
+    return {
+        "primary": pool_stats(async_engine),
+        "replicas": {
+            hostname: {
+                **pool_stats(engine),
+                "available": replica_down_until[hostname] <= now,
+            }
+            for hostname, engine in replica_engines.items()
+        },
+    }
+
+
+@router.get("/startup")
+def get_startup_stats():
+    return report
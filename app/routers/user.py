@@ -1,23 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas, utils
 from ..database import get_db
+from ..metrics import MetricsRoute
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=MetricsRoute)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    hashed_password = utils.hash(user.password)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    hashed_password = await utils.hash_async(user.password)
     user.password = hashed_password
 
     new_user = models.User(**user.model_dump())
     db.add(new_user)
     try:
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         return new_user
     except IntegrityError as e:
         if "unique constraint" in str(e):
@@ -30,6 +30,7 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     id: Optional[str] = None
+    exp: Optional[int] = None
 
 
 class Author(BaseModel):
@@ -91,9 +92,10 @@ class RecipeBase(BaseModel):
 
 
 class Recipe(RecipeBase):
-    cuisine: Optional[str] = None
-    author: Optional[str] = None
-    category: Optional[list[constr(to_lower=True)]] = None
+    # Bounded like the name columns they create rows in.
+    cuisine: Optional[constr(max_length=100)] = None
+    author: Optional[constr(max_length=100)] = None
+    category: Optional[list[constr(to_lower=True, max_length=100)]] = None
 
 
 class RecipeInDB(RecipeBase):
@@ -111,6 +113,52 @@ class RecipeOutDB(RecipeBase):
         from_attributes = True
 
 
+class RecipeMatchOut(BaseModel):
+    recipe: RecipeOutDB
+    matched: int
+    missing: int
+
+
+class ImportResult(BaseModel):
+    line: int
+    status: str
+    recipe_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class ImportSummary(BaseModel):
+    created: int
+    failed: int
+    results: list[ImportResult]
+
+
+class AuthorCategoryOut(CategoryOut):
+    recipe_count: int
+
+
+class AuthorCuisineOut(CuisineOut):
+    recipe_count: int
+
+
+class AuthorStats(BaseModel):
+    author_id: int
+    recipe_count: int
+    categories: list[AuthorCategoryOut]
+    cuisines: list[AuthorCuisineOut]
+
+
+class FacetCount(BaseModel):
+    id: int
+    name: str
+    count: int
+
+
+class RecipeFacets(BaseModel):
+    cuisines: list[FacetCount]
+    categories: list[FacetCount]
+    authors: list[FacetCount]
+
+
 class Ingredients(BaseModel):
     ingredients: conlist(str, min_length=1)
 
@@ -0,0 +1,143 @@
+from sqlalchemy import (
+    REAL,
+    Integer,
+    Text,
+    cast,
+    distinct,
+    func,
+    select,
+    text,
+    true,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, array
+
+from . import models
+from .config import settings
+
+
+def fulltext_search(query, search: str):
+    ts_query = func.websearch_to_tsquery("english", search)
+    weights = cast(array(settings.search_rank_weights), ARRAY(REAL))
+    rank = func.ts_rank_cd(weights, models.Recipe.search_vector, ts_query, type_=REAL)
+    return query.where(models.Recipe.search_vector.op("@@")(ts_query)), rank
+
+
+async def fuzzy_search(db, query, column, search: str):
+    # `%` is the trigram operator the GIN indexes serve; its cut-off is the
+    # transaction-local pg_trgm.similarity_threshold.
+    await db.execute(
+        text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+        {"threshold": str(settings.fuzzy_similarity_threshold)},
+    )
+    score = func.similarity(column, search, type_=REAL)
+    return query.where(column.op("%")(search)), score
+
+
+async def recipe_search(db, query, search, search_mode, author, cuisine):
+    # `query` must already join Author and Cuisine. Returns the filtered query
+    # with the keys to order it by.
+    keys, descending = [models.Recipe.recipe_id], False
+    if search_mode == "fuzzy":
+        score = None
+        for column, term in [
+            (models.Recipe.name, search),
+            (models.Author.name, author),
+            (models.Cuisine.name, cuisine),
+        ]:
+            if term:
+                query, term_score = await fuzzy_search(db, query, column, term)
+                score = term_score if score is None else score + term_score
+        if score is not None:
+            keys, descending = [score, models.Recipe.recipe_id], True
+    else:
+        query = query.where(
+            models.Author.name.ilike(f"%{author}%"),
+            models.Cuisine.name.ilike(f"%{cuisine}%"),
+        )
+        if search_mode == "fulltext" and search:
+            query, rank = fulltext_search(query, search)
+            keys, descending = [rank, models.Recipe.recipe_id], True
+        else:
+            query = query.where(models.Recipe.name.ilike(f"%{search}%"))
+    return query, keys, descending
+
+
+async def recipe_facets(db, search, search_mode, author, cuisine):
+    # One pass over the matching recipes, grouped three ways at once. Each
+    # grouping set leaves the other sets' columns NULL, and GROUPING() tells
+    # them apart from recipes that simply have no category.
+    query = (
+        select(
+            models.Recipe.recipe_id,
+            models.Cuisine.cuisine_id,
+            models.Cuisine.name.label("cuisine_name"),
+            models.Author.author_id,
+            models.Author.name.label("author_name"),
+        )
+        .join(models.Author, models.Author.author_id == models.Recipe.author_id)
+        .join(models.Cuisine, models.Cuisine.cuisine_id == models.Recipe.cuisine_id)
+    )
+    query, _, _ = await recipe_search(db, query, search, search_mode, author, cuisine)
+    matches = query.subquery("matches")
+    category_id = models.recipe_category.c.category_id
+    rows = await db.execute(
+        select(
+            func.grouping(matches.c.cuisine_id, category_id, matches.c.author_id),
+            matches.c.cuisine_id,
+            matches.c.cuisine_name,
+            category_id,
+            models.Category.name,
+            matches.c.author_id,
+            matches.c.author_name,
+            func.count(distinct(matches.c.recipe_id)),
+        )
+        .select_from(matches)
+        .outerjoin(
+            models.recipe_category,
+            models.recipe_category.c.recipe_id == matches.c.recipe_id,
+        )
+        .outerjoin(models.Category, models.Category.category_id == category_id)
+        .group_by(
+            func.grouping_sets(
+                tuple_(matches.c.cuisine_id, matches.c.cuisine_name),
+                tuple_(category_id, models.Category.name),
+                tuple_(matches.c.author_id, matches.c.author_name),
+            )
+        )
+    )
+    # grouping() sets a bit for each column left out of the row's set, so
+    # 0b011 is the cuisine set, 0b101 the category set and 0b110 the author set.
+    facets = {"cuisines": [], "categories": [], "authors": []}
+    for grouping, *values, count in rows:
+        if grouping == 0b011:
+            facets["cuisines"].append((values[0], values[1], count))
+        elif grouping == 0b101 and values[2] is not None:
+            facets["categories"].append((values[2], values[3], count))
+        elif grouping == 0b110:
+            facets["authors"].append((values[4], values[5], count))
+    return {
+        facet: [
+            {"id": id, "name": name, "count": count}
+            for id, name, count in sorted(counts, key=lambda c: (-c[2], c[1]))
+        ]
+        for facet, counts in facets.items()
+    }
+
+
+def ingredient_coverage(query, have):
+    # The request terms go through the same recipe_ingredient_tokens() function
+    # that maintains Recipe.ingredient_tokens, so they hit the same GIN keys.
+    tokens = func.recipe_ingredient_tokens(cast(array(have), ARRAY(Text)))
+    line = func.unnest(models.Recipe.ingredients).column_valued("line")
+    coverage = (
+        select(func.count().label("matched"))
+        .where(func.recipe_ingredient_tokens(array([line])).op("&&")(tokens))
+        .lateral("coverage")
+    )
+    matched = coverage.c.matched
+    missing = func.cardinality(models.Recipe.ingredients, type_=Integer) - matched
+    query = query.join(coverage, true()).where(
+        models.Recipe.ingredient_tokens.op("&&")(tokens)
+    )
+    return query, matched, missing
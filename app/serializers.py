@@ -0,0 +1,177 @@
+import csv
+import io
+import json
+import time
+from functools import lru_cache
+from typing import List, Optional
+
+import orjson
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from pydantic_core import to_jsonable_python
+
+from . import schemas
+from .config import settings
+from .metrics import record_serialization
+
+
+def _lower(value):
+    return value.lower() if value is not None else None
+
+
+def _duration(value):
+    return to_jsonable_python(value) if value is not None else None
+
+
+def author_out(author):
+    if author is None:
+        return None
+    return {
+        "name": _lower(author.name),
+        "bio": author.bio,
+        "author_id": author.author_id,
+    }
+
+
+def cuisine_out(cuisine):
+    if cuisine is None:
+        return None
+    return {"name": _lower(cuisine.name), "cuisine_id": cuisine.cuisine_id}
+
+
+def category_out(category):
+    return {"name": _lower(category.name), "category_id": category.category_id}
+
+
+_recipe_fields = {
+    "name": lambda recipe: _lower(recipe.name),
+    "url": lambda recipe: recipe.url,
+    "description": lambda recipe: recipe.description,
+    "servings": lambda recipe: recipe.servings,
+    "nutrition_facts": lambda recipe: recipe.nutrition_facts,
+    "ingredients": lambda recipe: recipe.ingredients,
+    "direction": lambda recipe: recipe.direction,
+    "prep_time": lambda recipe: _duration(recipe.prep_time),
+    "cook_time": lambda recipe: _duration(recipe.cook_time),
+    "total_time": lambda recipe: _duration(recipe.total_time),
+    "image_link": lambda recipe: recipe.image_link,
+    "video_link": lambda recipe: recipe.video_link,
+    "recipe_id": lambda recipe: recipe.recipe_id,
+    "categories": lambda recipe: [category_out(c) for c in recipe.categories],
+    "author": lambda recipe: author_out(recipe.author),
+    "cuisine": lambda recipe: cuisine_out(recipe.cuisine),
+}
+
+
+def parse_recipe_fields(fields: Optional[str]):
+    if not fields:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = names - _recipe_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}",
+        )
+    return frozenset(names | {"recipe_id"})
+
+
+def recipe_out(recipe, fields=None):
+    # Same keys, order and value formatting as schemas.RecipeOutDB, built
+    # straight from loaded rows without validating them again. Only `fields`
+    # are read, so attributes that were never loaded are not touched.
+    return {
+        name: get(recipe)
+        for name, get in _recipe_fields.items()
+        if fields is None or name in fields
+    }
+
+
+recipe_csv_columns = list(_recipe_fields)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def recipe_csv_rows(recipes):
+    # One CSV line per recipe: author, cuisine and categories are reduced to
+    # their names, and list/JSON values are written as JSON text.
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for recipe in recipes:
+        row = recipe_out(recipe)
+        row["categories"] = [category["name"] for category in row["categories"]]
+        row["author"] = row["author"] and row["author"]["name"]
+        row["cuisine"] = row["cuisine"] and row["cuisine"]["name"]
+        writer.writerow([_csv_value(value) for value in row.values()])
+    return buffer.getvalue()
+
+
+def recipe_match_out(match):
+    return {
+        "recipe": recipe_out(match["recipe"]),
+        "matched": match["matched"],
+        "missing": match["missing"],
+    }
+
+
+fast_serializers = {
+    schemas.RecipeOutDB: recipe_out,
+    List[schemas.RecipeOutDB]: lambda recipes, fields=None: [
+        recipe_out(r, fields) for r in recipes
+    ],
+    List[schemas.RecipeMatchOut]: lambda matches, fields=None: [
+        recipe_match_out(m) for m in matches
+    ],
+}
+
+
+def _stdlib_float(value):
+    # The stdlib writes 1e-05 and 1e+16 where orjson writes 1e-5 and 1e16;
+    # bodies holding such numbers go through the stdlib to stay identical.
+    if isinstance(value, float):
+        return value != 0 and not 1e-4 <= abs(value) < 1e16
+    if isinstance(value, dict):
+        return any(_stdlib_float(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_stdlib_float(v) for v in value)
+    return False
+
+
+def encode_json(payload):
+    if settings.fast_json_responses and not _stdlib_float(payload):
+        try:
+            return orjson.dumps(payload)
+        except orjson.JSONEncodeError:
+            pass
+    return JSONResponse(payload).body
+
+
+@lru_cache
+def _adapter(model):
+    return TypeAdapter(model)
+
+
+def render(model, content, fields=None):
+    # Returns the exact bytes FastAPI would send for `response_model=model`,
+    # or for the subset of its fields named in `fields`.
+    started = time.perf_counter()
+    if fields is not None or (
+        settings.fast_json_responses and model in fast_serializers
+    ):
+        body = encode_json(fast_serializers[model](content, fields))
+    else:
+        adapter = _adapter(model)
+        body = JSONResponse(
+            adapter.dump_python(
+                adapter.validate_python(content, from_attributes=True), mode="json"
+            )
+        ).body
+    record_serialization(time.perf_counter() - started)
+    return body
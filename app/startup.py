@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from sqlalchemy import exc, text
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+
+from . import utils
+from .config import settings
+from .database import async_engine, replica_engines
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"
+)
+
+report = {"phases": {}, "database_attempts": 0, "migrations": None}
+
+
+@contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        report["phases"][name] = time.perf_counter() - started
+
+
+def record_phase(name: str, seconds: float):
+    report["phases"][name] = seconds
+
+
+async def _connect():
+    # Retries with doubling delays so a briefly unavailable database delays
+    # startup instead of failing it.
+    delay = settings.startup_db_retry_delay_seconds
+    for attempt in range(1, settings.startup_db_retries + 1):
+        report["database_attempts"] = attempt
+        try:
+            return await async_engine.connect()
+        except (exc.DBAPIError, OSError) as e:
+            if attempt == settings.startup_db_retries:
+                raise
+            logger.warning(
+                "Database not reachable (attempt %d): %s; retrying in %.1fs",
+                attempt,
+                e,
+                delay,
+            )
+            await asyncio.sleep(delay)
+            delay *= 2
+
+
+async def _check_migrations(conn):
+    config = Config(ALEMBIC_INI)
+    config.set_main_option(
+        "script_location",
+        os.path.join(os.path.dirname(ALEMBIC_INI), "alembic"),
+    )
+    head = ScriptDirectory.from_config(config).get_current_head()
+    try:
+        current = (
+            await conn.scalars(text("SELECT version_num FROM alembic_version"))
+        ).all()
+    except exc.ProgrammingError:
+        current = []
+    report["migrations"] = {"head": head, "database": current}
+    if current != [head]:
+        message = f"Database is at revision {current or 'none'}, code expects {head}"
+        if settings.startup_migration_check == "fail":
+            raise RuntimeError(message)
+        logger.warning(message)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    with phase("openapi"):
+        app.openapi()
+    with phase("database_connect"):
+        conn = await _connect()
+    try:
+        if settings.startup_migration_check != "off":
+            with phase("migration_check"):
+                await _check_migrations(conn)
+    finally:
+        await conn.close()
+    report["total_seconds"] = sum(report["phases"].values())
+    yield
+    utils.shutdown_hash_pool()
+    for engine in [async_engine, *replica_engines.values()]:
+        await engine.dispose()
@@ -1,6 +1,24 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .config import settings
+
+# min/max rounds equal to the target make any hash with a different cost
+# "need update", so logins re-hash it at the configured cost.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds,
+)
+
+_hash_pool = None
+_hash_slots = None
 
 
 def hash(password: str):
@@ -9,3 +27,50 @@ def hash(password: str):
 
 def verify(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def _new_hash_pool():
+    return ProcessPoolExecutor(
+        max_workers=settings.password_hash_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+async def _run_in_hash_pool(func, *args):
+    # bcrypt is CPU bound and holds the GIL, so it runs in worker processes.
+    # At most `password_hash_max_pending` calls are queued; the rest wait here.
+    global _hash_pool, _hash_slots
+    if _hash_pool is None:
+        _hash_pool = _new_hash_pool()
+        _hash_slots = asyncio.Semaphore(settings.password_hash_max_pending)
+    loop = asyncio.get_running_loop()
+    async with _hash_slots:
+        pool = _hash_pool
+        try:
+            return await loop.run_in_executor(pool, func, *args)
+        except BrokenProcessPool:
+            # A worker died (OOM, kill) and the pool refuses all further work.
+            # Replace it once, unless a concurrent call already has.
+            if _hash_pool is pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+                _hash_pool = _new_hash_pool()
+            return await loop.run_in_executor(_hash_pool, func, *args)
+
+
+async def hash_async(password: str):
+    return await _run_in_hash_pool(hash, password)
+
+
+async def verify_and_update_async(plain_password, hashed_password):
+    return await _run_in_hash_pool(verify_and_update, plain_password, hashed_password)
+
+
+def shutdown_hash_pool():
+    global _hash_pool, _hash_slots
+    if _hash_pool is not None:
+        _hash_pool.shutdown(cancel_futures=True)
+        _hash_pool = _hash_slots = None
@@ -0,0 +1,69 @@
+"""Compare two baselines written by benchmarks.run.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.10
+
+Exits with status 1 if any scenario in both files got slower at p95 by more
+than --threshold, or now runs more queries per request.
+"""
+
+import argparse
+import json
+import sys
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps", "queries_per_request"]
+
+
+def change(before, after):
+    if not before:
+        return None
+    return (after - before) / before
+
+
+def compare(before, after, threshold):
+    rows, regressions = [], []
+    for name in before["scenarios"].keys() & after["scenarios"].keys():
+        old, new = before["scenarios"][name], after["scenarios"][name]
+        rows.append((name, {metric: (old[metric], new[metric]) for metric in METRICS}))
+        slower = change(old["p95_ms"], new["p95_ms"])
+        if slower is not None and slower > threshold:
+            regressions.append(f"{name}: p95 {slower:+.1%}")
+        if new["queries_per_request"] > old["queries_per_request"] + 0.01:
+            regressions.append(
+                f"{name}: queries/request {old['queries_per_request']:.2f}"
+                f" -> {new['queries_per_request']:.2f}"
+            )
+    return sorted(rows), regressions
+
+
+def main(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    rows, regressions = compare(before, after, args.threshold)
+    print(f"{'scenario':28}" + "".join(f"{metric:>24}" for metric in METRICS))
+    for name, values in rows:
+        cells = []
+        for old, new in values.values():
+            delta = change(old, new)
+            cells.append(
+                f"{new:>14.2f} ({delta:+7.1%})"
+                if delta is not None
+                else f"{new:>24.2f}"
+            )
+        print(f"{name:28}" + "".join(cells))
+    for name in sorted(before["scenarios"].keys() ^ after["scenarios"].keys()):
+        print(f"{name:28} only in one baseline")
+
+    if regressions:
+        print("\nRegressions:", *regressions, sep="\n  ")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    main(parser.parse_args())
@@ -0,0 +1,111 @@
+"""Fire concurrent logins at a running API and measure how the rest of it copes.
+
+    uvicorn app.main:app --workers 1 &
+    python benchmarks/login_storm.py --concurrency 50 --requests 500
+
+While the logins run, a probe requests GET / every --probe-interval seconds.
+Its latency shows whether password hashing is stalling other endpoints.
+Results are printed as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+
+def summary(samples):
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) * 1000 if samples else None,
+        **{
+            f"p{q}_ms": percentile(samples, q) * 1000 if samples else None
+            for q in (50, 95, 99)
+        },
+    }
+
+
+async def login_worker(client, queue, credentials, latencies, failures):
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        start = time.perf_counter()
+        response = await client.post("/login", data=credentials)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            failures.append(response.status_code)
+
+
+async def probe(client, interval, latencies, done):
+    while not done.is_set():
+        start = time.perf_counter()
+        await client.get("/")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def main(args):
+    credentials = {"username": args.email, "password": args.password}
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+        response = await client.post(
+            "/users/", json={"email": args.email, "password": args.password}
+        )
+        if response.status_code not in (201, 409):
+            raise SystemExit(f"Could not create user: {response.text}")
+
+        queue = asyncio.Queue()
+        for _ in range(args.requests):
+            queue.put_nowait(None)
+        login_latencies, probe_latencies, failures = [], [], []
+        done = asyncio.Event()
+        prober = asyncio.create_task(
+            probe(client, args.probe_interval, probe_latencies, done)
+        )
+        start = time.perf_counter()
+        await asyncio.gather(
+            *[
+                login_worker(client, queue, credentials, login_latencies, failures)
+                for _ in range(args.concurrency)
+            ]
+        )
+        elapsed = time.perf_counter() - start
+        done.set()
+        await prober
+
+    print(
+        json.dumps(
+            {
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "elapsed_s": elapsed,
+                "logins_per_s": args.requests / elapsed,
+                "failures": len(failures),
+                "login": summary(login_latencies),
+                "probe": summary(probe_latencies),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", default="login-storm@example.com")
+    parser.add_argument("--password", default="login-storm-password")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
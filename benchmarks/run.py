@@ -0,0 +1,285 @@
+"""Benchmark every router in-process and write a JSON baseline.
+
+    python -m benchmarks.run --seed-db --recipes 5000 --output baseline.json
+    python -m benchmarks.compare old.json baseline.json
+
+The app is driven through httpx's ASGI transport, so no server is started,
+but it talks to the configured Postgres. --seed-db re-creates the synthetic
+catalog from benchmarks.seed first, which TRUNCATEs the database.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import async_engine, replica_engines
+from app.main import app
+from benchmarks.seed import (
+    BENCH_EMAIL,
+    BENCH_PASSWORD,
+    WORDS,
+    add_size_arguments,
+    seed,
+)
+
+
+def _ingredients(rng):
+    return {"ingredients": [f"1 cup {word}" for word in rng.sample(WORDS, 6)]}
+
+
+def _direction(rng):
+    return {"direction": {"1": " ".join(rng.sample(WORDS, 10))}}
+
+
+# name -> (method, url, httpx request kwargs); `ctx` holds the seeded sizes.
+SCENARIOS = {
+    "recipes.list": lambda rng, ctx: ("GET", "/recipes/?limit=20", {}),
+    "recipes.list_fields": lambda rng, ctx: (
+        "GET",
+        "/recipes/?limit=50&fields=name,image_link,prep_time,total_time",
+        {},
+    ),
+    "recipes.search_substring": lambda rng, ctx: (
+        "GET",
+        f"/recipes/?search={rng.choice(WORDS)}",
+        {},
+    ),
+    "recipes.search_fulltext": lambda rng, ctx: (
+        "GET",
+        f"/recipes/?search_mode=fulltext&search={rng.choice(WORDS)}",
+        {},
+    ),
+    "recipes.search_fuzzy": lambda rng, ctx: (
+        "GET",
+        f"/recipes/?search_mode=fuzzy&search={rng.choice(WORDS)[:-1]}",
+        {},
+    ),
+    "recipes.by_ingredients": lambda rng, ctx: (
+        "GET",
+        "/recipes/by-ingredients?missing_max=8&"
+        + "&".join(f"have={word}" for word in rng.sample(WORDS, 5)),
+        {},
+    ),
+    "recipes.facets": lambda rng, ctx: (
+        "GET",
+        f"/recipes/facets?search={rng.choice(WORDS)}",
+        {},
+    ),
+    "recipes.detail": lambda rng, ctx: (
+        "GET",
+        f"/recipes/{rng.randint(1, ctx['recipes'])}",
+        {},
+    ),
+    "ingredients.get": lambda rng, ctx: (
+        "GET",
+        f"/recipes/{rng.randint(1, ctx['recipes'])}/ingredients",
+        {},
+    ),
+    "ingredients.put": lambda rng, ctx: (
+        "PUT",
+        f"/recipes/{rng.randint(1, ctx['recipes'])}/ingredients",
+        {"json": _ingredients(rng)},
+    ),
+    "direction.get": lambda rng, ctx: (
+        "GET",
+        f"/recipes/{rng.randint(1, ctx['recipes'])}/direction",
+        {},
+    ),
+    "direction.put": lambda rng, ctx: (
+        "PUT",
+        f"/recipes/{rng.randint(1, ctx['recipes'])}/direction",
+        {"json": _direction(rng)},
+    ),
+    "authors.list": lambda rng, ctx: ("GET", "/authors/", {}),
+    "authors.detail": lambda rng, ctx: (
+        "GET",
+        f"/authors/{rng.randint(1, ctx['authors'])}",
+        {},
+    ),
+    "authors.recipes": lambda rng, ctx: (
+        "GET",
+        f"/authors/{rng.randint(1, ctx['authors'])}/recipes",
+        {},
+    ),
+    "authors.categories": lambda rng, ctx: (
+        "GET",
+        f"/authors/{rng.randint(1, ctx['authors'])}/categories",
+        {},
+    ),
+    "authors.stats": lambda rng, ctx: (
+        "GET",
+        f"/authors/{rng.randint(1, ctx['authors'])}/stats",
+        {},
+    ),
+    "categories.list": lambda rng, ctx: ("GET", "/categories/", {}),
+    "categories.detail": lambda rng, ctx: (
+        "GET",
+        f"/categories/{rng.randint(1, ctx['categories'])}",
+        {},
+    ),
+    "cuisines.list": lambda rng, ctx: ("GET", "/cuisines/", {}),
+    "cuisines.detail": lambda rng, ctx: (
+        "GET",
+        f"/cuisines/{rng.randint(1, ctx['cuisines'])}",
+        {},
+    ),
+    "auth.login": lambda rng, ctx: (
+        "POST",
+        "/login",
+        {"data": {"username": BENCH_EMAIL, "password": BENCH_PASSWORD}},
+    ),
+}
+
+
+class QueryCounter:
+    def __init__(self, engines):
+        self.count = 0
+        for engine in engines:
+            event.listen(engine.sync_engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+
+async def send(client, spec, headers):
+    method, url, kwargs = spec
+    return await client.request(method, url, headers=headers, **kwargs)
+
+
+async def run_scenario(client, name, ctx, headers, counter, args):
+    rng = random.Random(f"{args.seed}:{name}")
+    make = SCENARIOS[name]
+    for _ in range(args.warmup):
+        await send(client, make(rng, ctx), headers)
+
+    specs = [make(rng, ctx) for _ in range(args.requests)]
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for spec in specs:
+        queue.put_nowait(spec)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            spec = queue.get_nowait()
+            start = time.perf_counter()
+            response = await send(client, spec, headers)
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code >= 400
+
+    queries_before = counter.count
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": args.requests,
+        "errors": errors,
+        "throughput_rps": args.requests / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "queries_per_request": (counter.count - queries_before) / args.requests,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    if args.seed_db:
+        await seed(
+            args.recipes, args.authors, args.cuisines, args.categories, args.seed
+        )
+    settings.rate_limit_enabled = False
+    ctx = {
+        "recipes": args.recipes,
+        "authors": args.authors,
+        "cuisines": args.cuisines,
+        "categories": args.categories,
+    }
+    names = [
+        name
+        for name in SCENARIOS
+        if not args.scenarios or any(name.startswith(s) for s in args.scenarios)
+    ]
+    counter = QueryCounter([async_engine, *replica_engines.values()])
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            login = await client.post(
+                "/login", data={"username": BENCH_EMAIL, "password": BENCH_PASSWORD}
+            )
+            login.raise_for_status()
+            headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+            for name in names:
+                results[name] = await run_scenario(
+                    client, name, ctx, headers, counter, args
+                )
+                print(
+                    f"{name:28} p50 {results[name]['p50_ms']:8.2f} ms"
+                    f"  p99 {results[name]['p99_ms']:8.2f} ms"
+                    f"  {results[name]['throughput_rps']:8.1f} req/s"
+                    f"  {results[name]['queries_per_request']:5.2f} q/req",
+                    file=sys.stderr,
+                )
+    await async_engine.dispose()
+
+    baseline = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "sizes": ctx,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "seed": args.seed,
+            "recipe_load_strategy": settings.recipe_load_strategy,
+            "fast_json_responses": settings.fast_json_responses,
+        },
+        "scenarios": results,
+    }
+    output = json.dumps(baseline, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_size_arguments(parser)
+    parser.add_argument("--seed-db", action="store_true")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--scenarios", nargs="*", help="name prefixes to run")
+    parser.add_argument("--output")
+    asyncio.run(main(parser.parse_args()))
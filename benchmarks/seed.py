@@ -0,0 +1,143 @@
+"""Fill the configured database with a reproducible synthetic catalog.
+
+    python -m benchmarks.seed --recipes 5000 --authors 200
+
+This TRUNCATEs users, authors, cuisines, categories and recipes first.
+Point DATABASE_NAME at a scratch database before running it.
+"""
+
+import argparse
+import asyncio
+import random
+from datetime import timedelta
+
+from sqlalchemy import create_engine, insert, text
+
+from app import models, utils
+from app.config import settings
+from app.database import async_engine
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+WORDS = (
+    "apple basil butter carrot cheese chicken chili cream egg flour garlic ginger "
+    "honey lemon lime milk mushroom noodle onion pepper pork potato rice salmon "
+    "salt spinach sugar thyme tomato vinegar yogurt zucchini"
+).split()
+DISHES = ["soup", "stew", "salad", "curry", "pie", "roast", "bake", "stir fry"]
+UNITS = ["1 cup", "2 tbsp", "1 tsp", "200 g", "3", "a pinch of", "half a"]
+
+
+def recipe_row(rng, index, owner_id, author_ids, cuisine_ids):
+    ingredients = rng.sample(WORDS, rng.randint(5, 12))
+    minutes = rng.randint(5, 90)
+    return {
+        "name": f"{ingredients[0]} {rng.choice(DISHES)} {index}",
+        "url": f"https://example.com/recipes/{index}",
+        "description": " ".join(rng.choices(WORDS, k=rng.randint(20, 60))),
+        "servings": str(rng.randint(1, 8)),
+        "nutrition_facts": {
+            "calories": rng.randint(100, 900),
+            "fat": f"{rng.randint(1, 40)}g",
+            "protein": f"{rng.randint(1, 60)}g",
+        },
+        "ingredients": [f"{rng.choice(UNITS)} {word}" for word in ingredients],
+        "direction": {
+            str(step): " ".join(rng.choices(WORDS, k=rng.randint(8, 20)))
+            for step in range(1, rng.randint(3, 10))
+        },
+        "prep_time": timedelta(minutes=minutes),
+        "cook_time": timedelta(minutes=minutes * 2),
+        "total_time": timedelta(minutes=minutes * 3),
+        "image_link": f"https://example.com/images/{index}.jpg",
+        "video_link": None,
+        "author_id": rng.choice(author_ids),
+        "cuisine_id": rng.choice(cuisine_ids),
+        "owner_id": owner_id,
+    }
+
+
+async def seed(recipes, authors, cuisines, categories, seed=0, batch_size=1000):
+    rng = random.Random(seed)
+    engine = create_engine(
+        f"postgresql://{settings.database_username}:{settings.database_password}"
+        f"@{settings.database_hostname}:{settings.database_port}/{settings.database_name}"
+    )
+    models.Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            text(
+                "TRUNCATE users, authors, cuisines, categories, recipes, "
+                "recipe_category RESTART IDENTITY CASCADE"
+            )
+        )
+        owner_id = await conn.scalar(
+            insert(models.User)
+            .values(email=BENCH_EMAIL, password=utils.hash(BENCH_PASSWORD))
+            .returning(models.User.id)
+        )
+
+        async def named_rows(model, count, prefix):
+            rows = [
+                {"name": f"{prefix} {i}", "owner_id": owner_id} for i in range(count)
+            ]
+            ids = await conn.scalars(
+                insert(model.__table__).returning(
+                    *model.__table__.primary_key.columns, sort_by_parameter_order=True
+                ),
+                rows,
+            )
+            return ids.all()
+
+        author_ids = await named_rows(models.Author, authors, "author")
+        cuisine_ids = await named_rows(models.Cuisine, cuisines, "cuisine")
+        category_ids = await named_rows(models.Category, categories, "category")
+
+        for start in range(0, recipes, batch_size):
+            rows = [
+                recipe_row(rng, index, owner_id, author_ids, cuisine_ids)
+                for index in range(start, min(start + batch_size, recipes))
+            ]
+            recipe_ids = (
+                await conn.scalars(
+                    insert(models.Recipe.__table__).returning(
+                        models.Recipe.recipe_id, sort_by_parameter_order=True
+                    ),
+                    rows,
+                )
+            ).all()
+            await conn.execute(
+                insert(models.recipe_category),
+                [
+                    {"recipe_id": recipe_id, "category_id": category_id}
+                    for recipe_id in recipe_ids
+                    for category_id in rng.sample(
+                        category_ids, min(len(category_ids), rng.randint(1, 3))
+                    )
+                ],
+            )
+        await conn.execute(text("ANALYZE"))
+
+
+def add_size_arguments(parser):
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--authors", type=int, default=100)
+    parser.add_argument("--cuisines", type=int, default=20)
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_size_arguments(parser)
+    args = parser.parse_args()
+
+    async def main():
+        await seed(
+            args.recipes, args.authors, args.cuisines, args.categories, args.seed
+        )
+        await async_engine.dispose()
+
+    asyncio.run(main())